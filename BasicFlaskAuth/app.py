@@ -1,8 +1,11 @@
 from flask import Flask, request, abort
-import json
+import os
 from functools import wraps
 from jose import jwt
-from urllib.request import urlopen
+
+from jwks import JWKSKeyStore
+from permissions import compile_permissions, granted_permissions
+from token_cache import VerifiedTokenCache
 
 
 app = Flask(__name__)
@@ -10,6 +13,11 @@ app = Flask(__name__)
 AUTH0_DOMAIN = 'mycafe.auth0.com'
 ALGORITHMS = ['RS256']
 API_AUDIENCE = 'image'
+# Override to point at a local JWKS file or stub server in tests.
+JWKS_URL = os.environ.get('JWKS_URL', f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
+
+jwks_store = JWKSKeyStore(JWKS_URL)
+verified_tokens = VerifiedTokenCache()
 
 
 class AuthError(Exception):
@@ -52,25 +60,14 @@ def get_token_auth_header():
 
 
 def verify_decode_jwt(token):
-    jsonurl = urlopen(f'https://{AUTH0_DOMAIN}/.well-known/jwks.json')
-    jwks = json.loads(jsonurl.read())
     unverified_header = jwt.get_unverified_header(token)
-    rsa_key = {}
     if 'kid' not in unverified_header:
         raise AuthError({
             'code': 'invalid_header',
             'description': 'Authorization malformed.'
         }, 401)
 
-    for key in jwks['keys']:
-        if key['kid'] == unverified_header['kid']:
-            rsa_key = {
-                'kty': key['kty'],
-                'kid': key['kid'],
-                'use': key['use'],
-                'n': key['n'],
-                'e': key['e']
-            }
+    rsa_key = jwks_store.get_key(unverified_header['kid'])
     if rsa_key:
         try:
             payload = jwt.decode(
@@ -105,14 +102,19 @@ def verify_decode_jwt(token):
             }, 400)
 
 
-def check_permissions(permission, payload):
-    if 'permissions' not in payload:
-                        raise AuthError({
-                            'code': 'invalid_claims',
-                            'description': 'Permissions not included in JWT.'
-                        }, 400)
+def check_permissions(permission, payload, granted=None):
+    """permission is a string, a list of strings that are all required, or
+    an all_of/any_of requirement. granted is the payload's permissions as
+    a frozenset, when the caller already has it."""
+    if granted is None:
+        granted = granted_permissions(payload)
+    if granted is None:
+        raise AuthError({
+            'code': 'invalid_claims',
+            'description': 'Permissions not included in JWT.'
+        }, 400)
 
-    if permission not in payload['permissions']:
+    if not compile_permissions(permission).satisfied_by(granted):
         raise AuthError({
             'code': 'unauthorized',
             'description': 'Permission not found.'
@@ -121,15 +123,17 @@ def check_permissions(permission, payload):
 
 
 def requires_auth(permission=""):
+    requirement = compile_permissions(permission)
+
     def requires_auth_decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
             token = get_token_auth_header()
             try:
-                payload = verify_decode_jwt(token)
+                payload, granted = verified_tokens.get_or_verify(token, verify_decode_jwt)
             except:
                 abort(401)
-            check_permissions(permission, payload)
+            check_permissions(requirement, payload, granted)
             return f(payload, *args, **kwargs)
         return wrapper
     return requires_auth_decorator
@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from jwks import JWKSKeyStore
+
+
+def jwk(kid):
+    return {'kty': 'RSA', 'kid': kid, 'use': 'sig', 'n': 'modulus-' + kid, 'e': 'AQAB'}
+
+
+class CountingKeyStore(JWKSKeyStore):
+    """Counts every read of the JWKS source, successful or not."""
+
+    fetches = 0
+
+    def _read(self):
+        self.fetches += 1
+        return super()._read()
+
+
+class JWKSKeyStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'jwks.json')
+        self.write_keys('key-1')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_keys(self, *kids):
+        with open(self.path, 'w') as jwks_file:
+            json.dump({'keys': [jwk(kid) for kid in kids]}, jwks_file)
+
+    def test_keys_are_fetched_once_until_they_expire(self):
+        store = CountingKeyStore(self.path)
+
+        for _ in range(10):
+            self.assertEqual(store.get_key('key-1')['n'], 'modulus-key-1')
+        self.assertEqual(store.fetches, 1)
+
+    def test_unknown_kid_refetch_is_rate_limited(self):
+        store = CountingKeyStore(self.path, min_refetch_interval=60)
+        store.get_key('key-1')
+        self.write_keys('key-1', 'key-2')
+
+        for _ in range(10):
+            self.assertIsNone(store.get_key('key-2'))
+        self.assertEqual(store.fetches, 1)
+
+    def test_unknown_kid_is_found_after_rotation(self):
+        store = CountingKeyStore(self.path, min_refetch_interval=0)
+        store.get_key('key-1')
+        self.write_keys('key-1', 'key-2')
+
+        self.assertEqual(store.get_key('key-2')['kid'], 'key-2')
+        self.assertEqual(store.fetches, 2)
+
+    def test_outage_serves_stale_keys_without_refetching_per_request(self):
+        store = CountingKeyStore(self.path, default_max_age=0, min_refetch_interval=60)
+        store.get_key('key-1')
+        os.remove(self.path)
+
+        for _ in range(100):
+            self.assertEqual(store.get_key('key-1')['kid'], 'key-1')
+        # the first fetch, then one failed refetch of the expired document
+        self.assertEqual(store.fetches, 2)
+
+    def test_failed_fetch_is_retried_after_the_interval(self):
+        store = CountingKeyStore(self.path, default_max_age=0, min_refetch_interval=0.05)
+        store.get_key('key-1')
+        os.remove(self.path)
+        store.get_key('key-1')
+        self.write_keys('key-2')
+        time.sleep(0.06)
+
+        self.assertEqual(store.get_key('key-2')['kid'], 'key-2')
+        self.assertEqual(store.fetches, 3)
+
+    def test_unreachable_source_without_keys_is_not_refetched_per_request(self):
+        os.remove(self.path)
+        store = CountingKeyStore(self.path, min_refetch_interval=60)
+
+        with self.assertRaises(OSError):
+            store.get_key('key-1')
+        for _ in range(10):
+            self.assertIsNone(store.get_key('key-1'))
+        self.assertEqual(store.fetches, 1)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
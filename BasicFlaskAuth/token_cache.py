@@ -0,0 +1,85 @@
+# Keep in sync with the token_cache.py of the other project: BasicFlaskAuth
+# and the coffee shop backend each carry a copy, differing only in how
+# permissions is imported.
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from permissions import granted_permissions
+
+DEFAULT_MAXSIZE = 1024
+DEFAULT_TTL = 300
+
+
+class VerifiedTokenCache:
+    """Payloads of tokens that already passed signature and claims checks,
+    each with its permissions claim compiled into a frozenset.
+
+    Entries are keyed by a SHA-256 of the raw token, so the cache never holds
+    bearer tokens themselves. An entry lives for at most ttl seconds and
+    never past the token's own exp claim; the least recently used entry is
+    dropped once maxsize is reached. Tokens that fail verification are not
+    cached, so every retry is checked again.
+
+    Cached payloads are shared between requests and must not be modified.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.verify_seconds = 0.0
+
+    def get_or_verify(self, token, verify):
+        """(payload, permissions) for token, from the cache or from
+        verify(token)."""
+        key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                payload, permissions, expires_at = entry
+                if now < expires_at:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return payload, permissions
+                del self.entries[key]
+            self.misses += 1
+
+        started = time.perf_counter()
+        payload = verify(token)
+        elapsed = time.perf_counter() - started
+        permissions = granted_permissions(payload)
+
+        expires_at = now + self.ttl
+        if 'exp' in payload:
+            expires_at = min(expires_at, payload['exp'])
+        with self.lock:
+            self.verify_seconds += elapsed
+            self.entries[key] = (payload, permissions, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return payload, permissions
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Hit rate and the verification time hits are estimated to have saved."""
+        with self.lock:
+            lookups = self.hits + self.misses
+            average = self.verify_seconds / self.misses if self.misses else 0.0
+            return {
+                'size': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'verify_seconds': self.verify_seconds,
+                'saved_seconds': self.hits * average
+            }
@@ -4,10 +4,14 @@
 
 import json
 import sys
+from datetime import datetime
+from functools import lru_cache
 
 import dateutil.parser
 import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+import babel.dates
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort, \
+    stream_with_context, before_render_template, template_rendered
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
 import logging
@@ -16,6 +20,10 @@ from flask_wtf import Form
 
 from forms import *
 from models import db_setup, Venue, Show, Artist
+from queries import venues_by_area, set_past_and_upcoming_shows, shows_page, decode_cursor, \
+    filter_by_genre
+from search import search
+from profiling import RequestProfiler
 
 #----------------------------------------------------------------------------#
 # App Config.
@@ -24,56 +32,46 @@ from models import db_setup, Venue, Show, Artist
 app = Flask(__name__)
 moment = Moment(app)
 db = db_setup(app)
+profiler = RequestProfiler(app)
 
 #----------------------------------------------------------------------------#
-# Helper Function.
+# Filters.
 #----------------------------------------------------------------------------#
 
-def now_with_tzinfo(other_time):
-    return datetime.now(other_time.tzinfo)
-
-def set_past_and_upcoming_shows(obj):
-    def get_show_obj_list(showlist, obj):
-        show_obj_list = []
-        if isinstance(obj, Venue):
-            for show in showlist:
-                show_obj_list.append({
-                    "artist_id": show.artist_id,
-                    "artist_name": show.artist.name,
-                    "artist_image_link": show.artist.image_link,
-                    "start_time": show.start_time.strftime("%Y-%m-%dT%H:%M:%S.000%Z")
-                })
-        else:
-            for show in showlist:
-                show_obj_list.append({
-                    "venue_id": show.venue_id,
-                    "venue_name": show.venue.name,
-                    "venue_image_link": show.venue.image_link,
-                    "start_time": show.start_time.strftime("%Y-%m-%dT%H:%M:%S.000%Z")
-                })
-        return show_obj_list
-    past_shows = [show for show in obj.shows if show.start_time < now_with_tzinfo(show.start_time)]
-    obj.past_shows = get_show_obj_list(past_shows, obj)
-    obj.past_shows_count = len(obj.past_shows)
-    upcoming_shows = [show for show in obj.shows if show.start_time >= now_with_tzinfo(show.start_time)]
-    obj.upcoming_shows = get_show_obj_list(upcoming_shows, obj)
-    obj.upcoming_shows_count = len(obj.upcoming_shows)
+DATETIME_FORMATS = {
+    'full': babel.dates.parse_pattern("EEEE MMMM, d, y 'at' h:mma"),
+    'medium': babel.dates.parse_pattern("EE MM, dd, y h:mma"),
+}
 
+@lru_cache(maxsize=1024)
+def parse_datetime(value):
+    return dateutil.parser.parse(value)
 
-#----------------------------------------------------------------------------#
-# Filters.
-#----------------------------------------------------------------------------#
+@lru_cache(maxsize=4096)
+def _format_datetime(date, utcoffset, format, locale):
+    # utcoffset is part of the key: aware datetimes at the same instant in
+    # different zones compare equal but render differently.
+    pattern = DATETIME_FORMATS.get(format) or babel.dates.parse_pattern(format)
+    return pattern.apply(date, babel.Locale.parse(locale))
 
-def format_datetime(value, format='medium'):
-    date = dateutil.parser.parse(value)
-    if format == 'full':
-        format="EEEE MMMM, d, y 'at' h:mma"
-    elif format == 'medium':
-        format="EE MM, dd, y h:mma"
-    return babel.dates.format_datetime(date, format)
+def format_datetime(value, format='medium', locale=None):
+    if not isinstance(value, datetime):
+        value = parse_datetime(value)
+    return _format_datetime(value, value.utcoffset(), format, locale or babel.dates.LC_TIME)
 
 app.jinja_env.filters['datetime'] = format_datetime
 
+def stream_template(template_name, **context):
+    # render_template builds the whole page first; this yields it in chunks.
+    # It sends the same signals around the render, so the profiler times it.
+    app.update_template_context(context)
+    template = app.jinja_env.get_template(template_name)
+    before_render_template.send(app, template=template, context=context)
+    stream = template.stream(context)
+    stream.enable_buffering(5)
+    yield from stream
+    template_rendered.send(app, template=template, context=context)
+
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
@@ -88,51 +86,21 @@ def index():
 
 @app.route('/venues/')
 def venues():
-    data = []
-    unique_state_and_cities = Venue.query.distinct(Venue.city, Venue.state).all()
-    for sample_venue in unique_state_and_cities:
-        data.append({'city': sample_venue.city,
-                     'state': sample_venue.state,
-                     'venues': []})
-        venues_in_area = Venue.query.filter_by(city=sample_venue.city, state=sample_venue.state).all()
-        for venue in venues_in_area:
-            num_upcoming_shows = len([show for show in venue.shows if show.start_time >= now_with_tzinfo(show.start_time)])
-            venue_data = {'id': venue.id,
-                          'name': venue.name,
-                          'num_upcoming_shows':num_upcoming_shows}
-            data[-1]['venues'].append(venue_data)
-    return render_template('pages/venues.html', areas=data);
+    return render_template('pages/venues.html', areas=venues_by_area(genre=request.args.get('genre')))
 
 @app.route('/venues/search', methods=['POST'])
 def search_venues():
     """
-    search on artists with partial string search. Ensure it is case-insensitive.
+    search on venues with ranked partial string search. Ensure it is case-insensitive.
     """
-    data = []
-    search_term = request.form.get('search_term')
-    match_venues = Venue.query.filter(Venue.name.ilike(f"%{search_term}%")).all()
-    for venue in match_venues:
-        venue_id = venue.id
-        venue_name = venue.name
-        num_upcoming_shows = Show.query.filter_by(venue_id=venue_id) \
-            .filter(Show.start_time > datetime.now()).count()
-        data.append({
-            "id": venue_id,
-            "name": venue_name,
-            "num_upcoming_shows": num_upcoming_shows
-        })
-    response = {
-        "count": len(data),
-        "data": data
-    }
+    response = search(Venue, request.form.get('search_term', ''), request.values.get('genre'))
     return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
 
 @app.route('/venues/<int:venue_id>')
 def show_venue(venue_id):
     # shows the venue page with the given venue_id
     venue = Venue.query.get_or_404(venue_id)
-    venue.genres = venue.genres.split(',')
-    set_past_and_upcoming_shows(venue)
+    set_past_and_upcoming_shows(venue, request.args.get('past_page', 1, type=int))
     return render_template('pages/show_venue.html', venue=venue)
 
 #  Create Venue
@@ -152,7 +120,6 @@ def create_venue_submission():
         return render_template("forms/new_venue.html", form=venue_form)
     try:
         new_venue = Venue()
-        venue_form.genres.data = ','.join(venue_form.genres.data)
         venue_form.populate_obj(new_venue)
         db.session.add(new_venue)
         db.session.commit()
@@ -186,7 +153,7 @@ def delete_venue(venue_id):
 @app.route('/artists/')
 def artists():
     data = []
-    for artist in Artist.query.all():
+    for artist in filter_by_genre(Artist.query, Artist, request.args.get('genre')):
         data.append({
             "id": artist.id,
             "name": artist.name
@@ -195,31 +162,14 @@ def artists():
 
 @app.route('/artists/search', methods=['POST'])
 def search_artists():
-    data = []
-    search_term = request.form.get('search_term')
-    match_artists = Artist.query.filter(Artist.name.ilike(f"%{search_term}%")).all()
-    for artist in match_artists:
-        artist_id = artist.id
-        artist_name = artist.name
-        num_upcoming_shows = Show.query.filter_by(artist_id=artist_id)\
-            .filter(Show.start_time > datetime.now()).count()
-        data.append({
-            "id": artist_id,
-            "name": artist_name,
-            "num_upcoming_shows": num_upcoming_shows
-        })
-    response = {
-        "count": len(data),
-        "data": data
-    }
+    response = search(Artist, request.form.get('search_term', ''), request.values.get('genre'))
     return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
 @app.route('/artists/<int:artist_id>')
 def show_artist(artist_id):
     # shows the venue page with the given venue_id
     artist = Artist.query.get_or_404(artist_id)
-    artist.genres = artist.genres.split(',')
-    set_past_and_upcoming_shows(artist)
+    set_past_and_upcoming_shows(artist, request.args.get('past_page', 1, type=int))
     return render_template('pages/show_artist.html', artist=artist)
 
 @app.route('/artists/<int:artist_id>/delete', methods=['GET'])
@@ -242,7 +192,6 @@ def delete_artist(artist_id):
 def edit_artist(artist_id):
     artist = Artist.query.get_or_404(artist_id)
     form = ArtistForm(obj=artist)
-    form.genres.data = artist.genres.split(',')
     return render_template('forms/edit_artist.html', form=form, artist=artist)
 
 @app.route('/artists/<int:artist_id>/edit', methods=['POST'])
@@ -254,7 +203,6 @@ def edit_artist_submission(artist_id):
         artist = Artist.query.filter_by(id=artist_id).first_or_404()
         if not artist_form.validate():
             return render_template("forms/edit_artist.html", form=artist_form, artist=artist)
-        artist_form.genres.data = ','.join(request.form.getlist('genres'))
         artist_form.populate_obj(artist)
         db.session.commit()
         # on successful db insert, flash success
@@ -274,7 +222,6 @@ def edit_artist_submission(artist_id):
 def edit_venue(venue_id):
     venue = Venue.query.get_or_404(venue_id)
     form = VenueForm(obj=venue)
-    form.genres.data = venue.genres.split(',')
     return render_template('forms/edit_venue.html', form=form, venue=venue)
 
 @app.route('/venues/<int:venue_id>/edit', methods=['POST'])
@@ -284,7 +231,6 @@ def edit_venue_submission(venue_id):
     if not form.validate():
         return render_template("forms/edit_venue.html", form=form, venue=venue)
     try:
-        form.genres.data = ','.join(request.form.getlist('genres'))
         form.populate_obj(venue)
         db.session.commit()
         flash("The venue " + request.form['name'] + "has been successfully updated.")
@@ -313,7 +259,6 @@ def create_artist_submission():
         if not artist_form.validate():
             return render_template("forms/new_artist.html", form=artist_form)
         new_artist = Artist()
-        artist_form.genres.data = ','.join(artist_form.genres.data)
         artist_form.populate_obj(new_artist)
         db.session.add(new_artist)
         db.session.commit()
@@ -335,25 +280,21 @@ def create_artist_submission():
 
 @app.route('/shows')
 def shows():
-    # displays list of shows at /shows
-    data = []
-    for show in Show.query.all():
-        venue_id = show.venue_id
-        venue_name = Venue.query.get(venue_id).name
-        artist_id = show.artist_id
-        artist = Artist.query.get(artist_id)
-        artist_name = artist.name
-        artist_image_link = artist.image_link
-        start_time = str(show.start_time)
-        data.append({
-            "venue_id": venue_id,
-            "venue_name": venue_name,
-            "artist_id": artist_id,
-            "artist_name": artist_name,
-            "artist_image_link": artist_image_link,
-            "start_time": start_time
-        })
-    return render_template('pages/shows.html', shows=data)
+    # displays list of shows at /shows, one keyset page at a time
+    filters = {key: request.args[key]
+               for key in ('start', 'end', 'venue_id', 'artist_id') if request.args.get(key)}
+    try:
+        after = request.args.get('after')
+        page = shows_page(
+            after=decode_cursor(after) if after else None,
+            start=dateutil.parser.parse(filters['start']) if 'start' in filters else None,
+            end=dateutil.parser.parse(filters['end']) if 'end' in filters else None,
+            venue_id=int(filters['venue_id']) if 'venue_id' in filters else None,
+            artist_id=int(filters['artist_id']) if 'artist_id' in filters else None)
+    except (ValueError, OverflowError):
+        abort(400)
+    return Response(stream_with_context(
+        stream_template('pages/shows.html', shows=page, filters=filters)))
 
 @app.route('/shows/create')
 def create_shows():
@@ -373,7 +314,7 @@ def create_show_submission():
         venue_id = f.get('venue_id')
         artist_id = f.get('artist_id')
         if Venue.query.get(venue_id) and Artist.query.get(artist_id):
-            new_show = Show(venue_id=venue_id, artist_id=artist_id, start_time=f.get('start_time'))
+            new_show = Show(venue_id=venue_id, artist_id=artist_id, start_time=show_form.start_time.data)
             db.session.add(new_show)
             db.session.commit()
             flash('Show was successfully listed!')
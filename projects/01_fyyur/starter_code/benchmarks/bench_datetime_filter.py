@@ -0,0 +1,63 @@
+"""
+Rendering 10k show rows through the `datetime` Jinja filter, before and after
+it accepted datetimes, precompiled its patterns and memoized results.
+
+    $ DATABASE_URL=sqlite:// python -m benchmarks.bench_datetime_filter
+"""
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import babel.dates
+import dateutil.parser
+
+from app import app, format_datetime, parse_datetime, _format_datetime
+
+ROWS = 10000
+TEMPLATE = "{% for show in shows %}<h6>{{ show.start_time|datetime('full') }}</h6>{% endfor %}"
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def make_shows(distinct_times):
+    random.seed(0)
+    base = datetime(2020, 1, 1, 20, tzinfo=timezone.utc)
+    times = [base + timedelta(hours=random.randint(0, 24 * 365 * 3)) for _ in range(distinct_times)]
+    return [{'start_time': random.choice(times)} for _ in range(ROWS)]
+
+
+def render(filter_function, shows):
+    env = app.jinja_env.overlay()
+    env.filters['datetime'] = filter_function
+    template = env.from_string(TEMPLATE)
+    start = time.perf_counter()
+    template.render(shows=shows)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    print('%16s %12s %12s %12s' % ('distinct times', 'before ms', 'after ms', 'warm ms'))
+    for distinct_times in (ROWS, 1000, 50):
+        shows = make_shows(distinct_times)
+        legacy_shows = [{'start_time': show['start_time'].strftime("%Y-%m-%dT%H:%M:%S.000%Z")}
+                        for show in shows]
+        before = render(legacy_format_datetime, legacy_shows)
+        parse_datetime.cache_clear()
+        _format_datetime.cache_clear()
+        after = render(format_datetime, shows)
+        warm = render(format_datetime, shows)
+        print('%16d %12.1f %12.1f %12.1f' % (distinct_times, before, after, warm))
+
+
+if __name__ == '__main__':
+    main()
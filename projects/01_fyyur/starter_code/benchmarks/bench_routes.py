@@ -0,0 +1,270 @@
+"""
+Latency percentiles, SQL statements per request and peak Python memory of
+every Fyyur route, driven through the test client over a generated dataset
+(see benchmarks/generate.py).
+
+By default a fresh in-memory SQLite dataset is generated. Point DATABASE_URL
+at a throwaway database to measure PostgreSQL, or pass --no-generate to reuse
+one filled earlier. Save a run with --output and compare a later run against
+it with --compare:
+
+    $ python -m benchmarks.bench_routes --shows 100000 --output before.json
+    $ python -m benchmarks.bench_routes --shows 100000 --compare before.json
+    $ DATABASE_URL=postgresql://localhost:5432/fyyur_bench python -m benchmarks.bench_routes --shows 1000000
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timedelta, timezone
+from itertools import count
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import event, func
+
+from app import app, db
+from models import Venue, Artist, Show
+from forms import genre_choices
+from benchmarks.generate import generate
+
+# The forms still subclass flask_wtf.Form, which warns on every request.
+warnings.filterwarnings('ignore', message='"flask_wtf.Form" has been renamed')
+
+ITERATIONS = 50
+MEMORY_SAMPLES = 3
+# Slower than this ratio (or more statements) against --compare is flagged.
+REGRESSION_RATIO = 1.2
+
+
+class Sample:
+    """Ids the route requests are drawn from, picked once per run."""
+
+    def __init__(self, rng):
+        self.rng = rng
+        self.venue_ids = [id for id, in db.session.query(Venue.id)]
+        self.artist_ids = [id for id, in db.session.query(Artist.id)]
+        # The venue and artist with the most shows: the worst-case pages.
+        self.busiest_venue = db.session.query(Show.venue_id).group_by(Show.venue_id) \
+            .order_by(func.count().desc()).limit(1).scalar()
+        self.busiest_artist = db.session.query(Show.artist_id).group_by(Show.artist_id) \
+            .order_by(func.count().desc()).limit(1).scalar()
+        self.created_venues = []
+        self.created_artists = []
+        self.serial = count()
+        db.session.remove()
+
+    def venue(self):
+        return self.rng.choice(self.venue_ids)
+
+    def artist(self):
+        return self.rng.choice(self.artist_ids)
+
+    def owner_form(self, kind):
+        form = {
+            'name': 'Bench %s %d' % (kind, next(self.serial)),
+            'city': 'Austin',
+            'state': 'TX',
+            'phone': '555-555-5555',
+            'image_link': 'https://images.example.com/bench.jpg',
+            'genres': self.rng.sample([genre for genre, _ in genre_choices], 2),
+            'seeking_description': '',
+        }
+        if kind == 'Venue':
+            form.update(address='1 Bench St', seeking_talent='0')
+        else:
+            form.update(seeking_venue='0')
+        return form
+
+
+def created_ids(model, name):
+    ids = [id for id, in db.session.query(model.id).filter(model.name.like(name + '%'))]
+    db.session.remove()
+    return ids
+
+
+def future(rng):
+    start = datetime.now(timezone.utc) + timedelta(days=rng.randint(1, 365))
+    return start.strftime('%Y-%m-%d %H:%M:%S')
+
+
+# (name, method, path or path builder, form builder); run in this order, so
+# the delete routes remove the venues and artists the create routes added.
+ROUTES = [
+    ('index', 'GET', '/', None),
+    ('venues', 'GET', '/venues/', None),
+    ('venues by genre', 'GET', '/venues/?genre=Jazz', None),
+    ('venue', 'GET', lambda s: '/venues/%d' % s.venue(), None),
+    ('busiest venue', 'GET', lambda s: '/venues/%d' % s.busiest_venue, None),
+    ('venue search', 'POST', '/venues/search', lambda s: {'search_term': 'blue hall'}),
+    ('artists', 'GET', '/artists/', None),
+    ('artist', 'GET', lambda s: '/artists/%d' % s.artist(), None),
+    ('busiest artist', 'GET', lambda s: '/artists/%d' % s.busiest_artist, None),
+    ('artist search', 'POST', '/artists/search', lambda s: {'search_term': 'echo'}),
+    ('shows', 'GET', '/shows', None),
+    ('shows for venue', 'GET', lambda s: '/shows?venue_id=%d' % s.busiest_venue, None),
+    ('shows for artist', 'GET', lambda s: '/shows?artist_id=%d' % s.busiest_artist, None),
+    ('new venue form', 'GET', '/venues/create', None),
+    ('new artist form', 'GET', '/artists/create', None),
+    ('new show form', 'GET', '/shows/create', None),
+    ('edit venue form', 'GET', lambda s: '/venues/%d/edit' % s.venue(), None),
+    ('edit artist form', 'GET', lambda s: '/artists/%d/edit' % s.artist(), None),
+    ('create venue', 'POST', '/venues/create', lambda s: s.owner_form('Venue')),
+    ('create artist', 'POST', '/artists/create', lambda s: s.owner_form('Artist')),
+    ('create show', 'POST', '/shows/create',
+     lambda s: {'venue_id': s.venue(), 'artist_id': s.artist(), 'start_time': future(s.rng)}),
+    ('edit venue', 'POST', lambda s: '/venues/%d/edit' % s.rng.choice(s.created_venues),
+     lambda s: s.owner_form('Venue')),
+    ('edit artist', 'POST', lambda s: '/artists/%d/edit' % s.rng.choice(s.created_artists),
+     lambda s: s.owner_form('Artist')),
+    ('delete venue', 'GET', lambda s: '/venues/%d/delete' % s.created_venues.pop(), None),
+    ('delete artist', 'GET', lambda s: '/artists/%d/delete' % s.created_artists.pop(), None),
+]
+
+
+def request(client, sample, method, path, form):
+    path = path(sample) if callable(path) else path
+    data = form(sample) if form else None
+    response = client.open(path, method=method, data=data)
+    # /shows streams its body; read it all so rendering is timed too.
+    response.get_data()
+    return response.status_code
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def measure(client, sample, route, iterations, statements):
+    name, method, path, form = route
+    request(client, sample, method, path, form)  # warm up
+    timings = []
+    counts = []
+    statuses = set()
+    for _ in range(iterations):
+        del statements[:]
+        start = time.perf_counter()
+        statuses.add(request(client, sample, method, path, form))
+        timings.append((time.perf_counter() - start) * 1000)
+        counts.append(len(statements))
+    peak = 0
+    for _ in range(MEMORY_SAMPLES):
+        tracemalloc.start()
+        request(client, sample, method, path, form)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        'method': method,
+        'p50_ms': percentile(timings, 0.50),
+        'p95_ms': percentile(timings, 0.95),
+        'p99_ms': percentile(timings, 0.99),
+        'mean_ms': statistics.mean(timings),
+        'statements': max(counts),
+        'peak_kb': peak / 1024,
+        'status': sorted(statuses),
+    }
+
+
+def run(args):
+    results = {}
+    with app.app_context():
+        if args.generate:
+            dataset = generate(args.shows, args.seed)
+        else:
+            dataset = {'shows': db.session.query(Show).count()}
+        db.session.remove()
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *event_args: statements.append(event_args[2]))
+        app.config['WTF_CSRF_ENABLED'] = False
+        client = app.test_client()
+        sample = Sample(random.Random(args.seed))
+        for route in ROUTES:
+            name = route[0]
+            if args.only and name not in args.only:
+                continue
+            # Delete no more than was created, and edit only benchmark rows.
+            if name == 'edit venue':
+                sample.created_venues = created_ids(Venue, 'Bench Venue')
+            elif name == 'edit artist':
+                sample.created_artists = created_ids(Artist, 'Bench Artist')
+            owned = {'edit venue': sample.created_venues, 'delete venue': sample.created_venues,
+                     'edit artist': sample.created_artists,
+                     'delete artist': sample.created_artists}.get(name)
+            if owned is not None and len(owned) < args.iterations + MEMORY_SAMPLES + 1:
+                print('%-18s skipped: run the create routes first' % name)
+                continue
+            results[name] = measure(client, sample, route, args.iterations, statements)
+            print_row(name, results[name], flush=True)
+        database = db.engine.url.drivername
+    return {
+        'dataset': dataset,
+        'database': database,
+        'iterations': args.iterations,
+        'python': platform.python_version(),
+        'time': datetime.now(timezone.utc).isoformat(),
+        'routes': results,
+    }
+
+
+HEADER = '%-18s %8s %8s %8s %8s %6s %9s' % (
+    'route', 'p50 ms', 'p95 ms', 'p99 ms', 'mean ms', 'stmts', 'peak KB')
+
+
+def print_row(name, row, flush=False):
+    print('%-18s %8.2f %8.2f %8.2f %8.2f %6d %9.0f' % (
+        name, row['p50_ms'], row['p95_ms'], row['p99_ms'], row['mean_ms'],
+        row['statements'], row['peak_kb']), flush=flush)
+
+
+def compare(baseline, current):
+    print()
+    print('%-18s %16s %16s %12s' % ('route', 'p50 ms', 'p95 ms', 'stmts'))
+    regressions = []
+    for name, row in current['routes'].items():
+        old = baseline['routes'].get(name)
+        if old is None:
+            continue
+        slower = row['p95_ms'] > old['p95_ms'] * REGRESSION_RATIO
+        more = row['statements'] > old['statements']
+        print('%-18s %7.2f -> %6.2f %7.2f -> %6.2f %5d -> %4d%s' % (
+            name, old['p50_ms'], row['p50_ms'], old['p95_ms'], row['p95_ms'],
+            old['statements'], row['statements'], '  <-- regression' if slower or more else ''))
+        if slower or more:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--shows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--iterations', type=int, default=ITERATIONS)
+    parser.add_argument('--no-generate', dest='generate', action='store_false',
+                        help='benchmark the data already in DATABASE_URL')
+    parser.add_argument('--only', nargs='+', metavar='ROUTE',
+                        help='route names to run (quote names with spaces)')
+    parser.add_argument('--output', help='save the results as JSON')
+    parser.add_argument('--compare', help='a previous --output file to compare against')
+    args = parser.parse_args()
+
+    print(HEADER, flush=True)
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results)
+        if regressions:
+            print('\n%d route(s) regressed: %s' % (len(regressions), ', '.join(regressions)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Statement count and latency of the /venues/ listing as the venue count grows.
+
+Run from the starter_code directory against a throwaway database:
+
+    $ DATABASE_URL=sqlite:// python -m benchmarks.bench_venues
+"""
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import event
+
+from app import app, db
+from models import Venue, Artist, Show
+
+SIZES = (10, 100, 1000, 5000)
+SHOWS_PER_VENUE = 3
+CITIES = [('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX'),
+          ('Seattle', 'WA'), ('Chicago', 'IL')]
+
+
+def seed(n_venues):
+    db.drop_all()
+    db.create_all()
+    now = datetime.now(timezone.utc)
+    artist = Artist(name='Benchmark Artist', city='Austin', state='TX')
+    db.session.add(artist)
+    db.session.flush()
+    venues = []
+    for i in range(n_venues):
+        city, state = random.choice(CITIES)
+        venues.append(Venue(name='Venue %d' % i, city=city, state=state))
+    db.session.add_all(venues)
+    db.session.flush()
+    shows = []
+    for venue in venues:
+        for _ in range(SHOWS_PER_VENUE):
+            offset = timedelta(days=random.randint(-365, 365))
+            shows.append(Show(venue_id=venue.id, artist_id=artist.id, start_time=now + offset))
+    db.session.add_all(shows)
+    db.session.commit()
+
+
+def main():
+    random.seed(0)
+    statements = []
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *args: statements.append(args[2]))
+        client = app.test_client()
+        print('%8s %12s %12s' % ('venues', 'statements', 'ms'))
+        for size in SIZES:
+            seed(size)
+            db.session.remove()
+            del statements[:]
+            start = time.perf_counter()
+            response = client.get('/venues/')
+            elapsed = (time.perf_counter() - start) * 1000
+            assert response.status_code == 200
+            print('%8d %12d %12.1f' % (size, len(statements), elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Seeded synthetic Fyyur dataset: venues, artists, genres and shows at a
+chosen scale, with skewed popularity so a few venues and artists carry
+most of the shows, the way real listings do.
+
+Drops and recreates every table in DATABASE_URL first. For example:
+
+    $ DATABASE_URL=sqlite:////tmp/fyyur_bench.db python -m benchmarks.generate --shows 100000
+    $ DATABASE_URL=postgresql://localhost:5432/fyyur_bench python -m benchmarks.generate --shows 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from sqlalchemy import text
+
+from models import db, Venue, Artist, Show, Genre, venue_genres, artist_genres
+from forms import genre_choices
+
+BATCH_SIZE = 10000
+SHOWS_PER_VENUE = 20
+SHOWS_PER_ARTIST = 10
+# Zipf exponent of venue and artist popularity; 0 is uniform.
+POPULARITY_SKEW = 1.1
+PAST_DAYS = 730
+FUTURE_DAYS = 365
+CITIES = [('San Francisco', 'CA'), ('New York', 'NY'), ('Austin', 'TX'),
+          ('Seattle', 'WA'), ('Chicago', 'IL'), ('Nashville', 'TN'),
+          ('New Orleans', 'LA'), ('Denver', 'CO'), ('Portland', 'OR'),
+          ('Boston', 'MA'), ('Atlanta', 'GA'), ('Los Angeles', 'CA')]
+WORDS = ['Blue', 'Velvet', 'Hall', 'Room', 'Electric', 'Garden', 'Station',
+         'Echo', 'Lounge', 'Stage', 'Moon', 'Brass', 'Union', 'Social', 'Club']
+
+
+def popularity_weights(count, skew=POPULARITY_SKEW):
+    """Cumulative Zipf weights for ids 1..count, shuffled so popularity
+    isn't correlated with id order."""
+    weights = [1 / rank ** skew for rank in range(1, count + 1)]
+    random.shuffle(weights)
+    return list(accumulate(weights))
+
+
+def insert_batches(table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.session.execute(table.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(table.insert(), batch)
+
+
+def name(index):
+    return '%s %s %d' % (random.choice(WORDS), random.choice(WORDS), index)
+
+
+def owner_rows(count, kind):
+    for id in range(1, count + 1):
+        city, state = random.choice(CITIES)
+        row = {
+            'id': id,
+            'name': name(id),
+            'city': city,
+            'state': state,
+            'phone': '555-%03d-%04d' % (id % 1000, id % 10000),
+            'image_link': 'https://images.example.com/%s/%d.jpg' % (kind, id),
+            'facebook_link': 'https://www.facebook.com/%s%d' % (kind, id),
+            'website': 'https://%s%d.example.com' % (kind, id),
+            'seeking_description': '',
+        }
+        if kind == 'venue':
+            row.update(address='%d Main St' % id, seeking_talent=id % 3 == 0)
+        else:
+            row.update(seeking_venue=id % 4 == 0)
+        yield row
+
+
+def genre_rows(owner_count, owner_column, genre_count):
+    for owner_id in range(1, owner_count + 1):
+        for genre_id in random.sample(range(1, genre_count + 1), random.randint(1, 3)):
+            yield {owner_column: owner_id, 'genre_id': genre_id}
+
+
+def show_rows(count, venue_weights, artist_weights, now):
+    venue_ids = range(1, len(venue_weights) + 1)
+    artist_ids = range(1, len(artist_weights) + 1)
+    for start in range(0, count, BATCH_SIZE):
+        size = min(BATCH_SIZE, count - start)
+        venues = random.choices(venue_ids, cum_weights=venue_weights, k=size)
+        artists = random.choices(artist_ids, cum_weights=artist_weights, k=size)
+        for venue_id, artist_id in zip(venues, artists):
+            hours = random.randint(-PAST_DAYS * 24, FUTURE_DAYS * 24)
+            yield {'venue_id': venue_id, 'artist_id': artist_id,
+                   'start_time': now + timedelta(hours=hours)}
+
+
+def generate(shows, seed=0, now=None):
+    """
+    Replace the database contents with a dataset of `shows` shows. Returns
+    the row counts. The same seed and `now` always give the same data.
+    """
+    random.seed(seed)
+    now = (now or datetime.now(timezone.utc)).replace(minute=0, second=0, microsecond=0)
+    venue_count = max(10, shows // SHOWS_PER_VENUE)
+    artist_count = max(10, shows // SHOWS_PER_ARTIST)
+    genre_names = [genre for genre, _ in genre_choices]
+
+    db.drop_all()
+    db.create_all()
+    insert_batches(Genre.__table__, ({'id': id, 'name': genre}
+                                     for id, genre in enumerate(genre_names, 1)))
+    insert_batches(Venue.__table__, owner_rows(venue_count, 'venue'))
+    insert_batches(Artist.__table__, owner_rows(artist_count, 'artist'))
+    insert_batches(venue_genres, genre_rows(venue_count, 'venue_id', len(genre_names)))
+    insert_batches(artist_genres, genre_rows(artist_count, 'artist_id', len(genre_names)))
+    insert_batches(Show.__table__, show_rows(shows, popularity_weights(venue_count),
+                                             popularity_weights(artist_count), now))
+    db.session.commit()
+    if db.engine.dialect.name == 'postgresql':
+        # Explicit ids leave the sequences behind; keep later inserts working.
+        for table in ('Genre', 'Venue', 'Artist'):
+            db.session.execute(text(
+                "SELECT setval(pg_get_serial_sequence('\"%s\"', 'id'), "
+                "(SELECT max(id) FROM \"%s\"))" % (table, table)))
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+    return {'venues': venue_count, 'artists': artist_count,
+            'genres': len(genre_names), 'shows': shows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--shows', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if 'DATABASE_URL' not in os.environ:
+        sys.exit('Set DATABASE_URL to the (throwaway) database to fill.')
+
+    from app import app
+    with app.app_context():
+        start = time.perf_counter()
+        counts = generate(args.shows, args.seed)
+        print('%(venues)d venues, %(artists)d artists, %(genres)d genres, %(shows)d shows'
+              % counts, 'in %.1fs' % (time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,8 @@ from wtforms import StringField, SelectField, SelectMultipleField, DateTimeField
 from wtforms.validators import DataRequired, AnyOf, URL, InputRequired, Optional, Length
 from wtforms import validators
 
+from models import genres_from_names
+
 
 state_choices = [
             ('AL', 'AL'),
@@ -82,6 +84,18 @@ genre_choices = [
         ]
 
 
+class GenreField(SelectMultipleField):
+    """
+    Multi-select of genre names bound to a Genre relationship on the model.
+    """
+    def process_data(self, value):
+        if value:
+            value = [getattr(genre, 'name', genre) for genre in value]
+        super(GenreField, self).process_data(value)
+
+    def populate_obj(self, obj, name):
+        setattr(obj, name, genres_from_names(self.data))
+
 class ShowForm(Form):
     artist_id = IntegerField(
         'artist_id'
@@ -118,7 +132,7 @@ class VenueForm(Form):
     website = StringField(
         'website', validators=[Optional(), URL(), Length(max=120)]
     )
-    genres = SelectMultipleField(
+    genres = GenreField(
         'genres', validators=[DataRequired()],
         choices=genre_choices)
     facebook_link = StringField(
@@ -156,7 +170,7 @@ class ArtistForm(Form):
     image_link = StringField(
         'image_link', validators=[URL()]
     )
-    genres = SelectMultipleField(
+    genres = GenreField(
         # TODO implement enum restriction
         'genres', validators=[DataRequired()],
         choices=genre_choices)
@@ -0,0 +1,88 @@
+"""normalize genres into Genre and association tables
+
+Revision ID: fc486ee3b62a
+Revises: fcfae8ce6e4c
+Create Date: 2026-10-18 10:41:07.118245
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fc486ee3b62a'
+down_revision = 'fcfae8ce6e4c'
+branch_labels = None
+depends_on = None
+
+genre = sa.table('Genre', sa.column('id', sa.Integer), sa.column('name', sa.String))
+owners = {
+    'venue': sa.table('Venue', sa.column('id', sa.Integer), sa.column('genres', sa.String)),
+    'artist': sa.table('Artist', sa.column('id', sa.Integer), sa.column('genres', sa.String)),
+}
+links = {
+    kind: sa.table('%s_genres' % kind, sa.column('%s_id' % kind, sa.Integer), sa.column('genre_id', sa.Integer))
+    for kind in owners
+}
+
+
+def upgrade():
+    op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    for kind, table_name in (('venue', 'Venue'), ('artist', 'Artist')):
+        op.create_table('%s_genres' % kind,
+        sa.Column('%s_id' % kind, sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['%s_id' % kind], ['%s.id' % table_name], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('%s_id' % kind, 'genre_id')
+        )
+        op.create_index('ix_%s_genres_genre_id_%s_id' % (kind, kind), '%s_genres' % kind,
+                        ['genre_id', '%s_id' % kind], unique=False)
+
+    # Backfill from the comma-joined strings before dropping them.
+    bind = op.get_bind()
+    parsed = {}
+    for kind, owner in owners.items():
+        parsed[kind] = [(row.id, list(dict.fromkeys(name.strip() for name in (row.genres or '').split(',')
+                                                    if name.strip())))
+                        for row in bind.execute(owner.select())]
+    names = sorted({name for rows in parsed.values() for _, row_names in rows for name in row_names})
+    if names:
+        op.bulk_insert(genre, [{'name': name} for name in names])
+    genre_ids = {row.name: row.id for row in bind.execute(genre.select())}
+    for kind, rows in parsed.items():
+        link_rows = [{'%s_id' % kind: owner_id, 'genre_id': genre_ids[name]}
+                     for owner_id, row_names in rows for name in row_names]
+        if link_rows:
+            op.bulk_insert(links[kind], link_rows)
+
+    op.drop_column('Venue', 'genres')
+    op.drop_column('Artist', 'genres')
+
+
+def downgrade():
+    op.add_column('Artist', sa.Column('genres', sa.VARCHAR(length=120), autoincrement=False, nullable=True))
+    op.add_column('Venue', sa.Column('genres', sa.VARCHAR(length=120), autoincrement=False, nullable=True))
+
+    bind = op.get_bind()
+    genre_names = {row.id: row.name for row in bind.execute(genre.select())}
+    for kind, owner in owners.items():
+        joined = {}
+        for row in bind.execute(links[kind].select()):
+            joined.setdefault(row[0], []).append(genre_names[row.genre_id])
+        if joined:
+            bind.execute(owner.update().where(owner.c.id == sa.bindparam('owner_id'))
+                         .values(genres=sa.bindparam('joined_genres')),
+                         [{'owner_id': owner_id, 'joined_genres': ','.join(sorted(row_names))}
+                          for owner_id, row_names in joined.items()])
+
+    op.drop_index('ix_artist_genres_genre_id_artist_id', table_name='artist_genres')
+    op.drop_table('artist_genres')
+    op.drop_index('ix_venue_genres_genre_id_venue_id', table_name='venue_genres')
+    op.drop_table('venue_genres')
+    op.drop_table('Genre')
@@ -15,6 +15,36 @@ def db_setup(app):
 # Models.
 #----------------------------------------------------------------------------#
 
+venue_genres = db.Table(
+    'venue_genres',
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+    # The primary key serves venue -> genres; this one serves genre -> venues.
+    db.Index('ix_venue_genres_genre_id_venue_id', 'genre_id', 'venue_id')
+)
+
+artist_genres = db.Table(
+    'artist_genres',
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_artist_genres_genre_id_artist_id', 'genre_id', 'artist_id')
+)
+
+
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+
+def genres_from_names(names):
+    """Genre rows for the given names, creating the ones that don't exist yet."""
+    names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+    existing = {genre.name: genre for genre in Genre.query.filter(Genre.name.in_(names))} if names else {}
+    return [existing.get(name) or Genre(name=name) for name in names]
+
+
 class Venue(db.Model):
     __tablename__ = 'Venue'
 
@@ -27,10 +57,13 @@ class Venue(db.Model):
     website = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
+    genres = db.relationship('Genre', secondary=venue_genres, order_by=Genre.name)
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
 
+    # Matches the area listing's ORDER BY state, city.
+    __table_args__ = (db.Index('ix_Venue_state_city', 'state', 'city'),)
+
 class Artist(db.Model):
     __tablename__ = 'Artist'
 
@@ -39,7 +72,7 @@ class Artist(db.Model):
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
+    genres = db.relationship('Genre', secondary=artist_genres, order_by=Genre.name)
     website = db.Column(db.String(120))
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
@@ -55,3 +88,11 @@ class Show(db.Model):
     start_time = db.Column(db.TIMESTAMP(timezone=True), nullable=False)
     venue = db.relationship("Venue", backref=db.backref("shows", cascade="all, delete-orphan"))
     artist = db.relationship("Artist", backref=db.backref("shows", cascade="all, delete-orphan"))
+
+    # Detail pages and filtered listings look shows up by owner and time;
+    # the unfiltered /shows listing pages through (start_time, id).
+    __table_args__ = (
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+    )
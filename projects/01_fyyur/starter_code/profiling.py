@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, has_request_context, request, template_rendered, before_render_template, Response
+from flask import signals
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestStats:
+    __slots__ = ('endpoint', 'started', 'sql_count', 'sql_time', 'template_time', 'template_started')
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_started = None
+
+
+def _current_stats():
+    return getattr(g, '_request_stats', None) if has_request_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    if stats is not None:
+        conn.info.setdefault('_profiler_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats()
+    started = conn.info.get('_profiler_started')
+    if stats is not None and started:
+        stats.sql_count += 1
+        stats.sql_time += time.perf_counter() - started.pop()
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestProfiler:
+    """
+    Records SQL statement count, SQL time, template render time and wall time
+    for every request. In debug mode the numbers are returned as X-* response
+    headers, buffering streamed responses to measure them; totals per
+    endpoint are served at /metrics in the Prometheus text format. Requests
+    issuing more than PROFILER_N_PLUS_ONE_THRESHOLD statements are logged
+    and counted as likely N+1 query patterns.
+    """
+
+    def __init__(self, app=None):
+        self.lock = threading.Lock()
+        self.totals = defaultdict(lambda: defaultdict(float))
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PROFILER_N_PLUS_ONE_THRESHOLD', 20)
+        self.app = app
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        # Flask only sends signals when blinker is installed; without it
+        # template time is reported as 0.
+        if getattr(signals, 'signals_available', True):
+            before_render_template.connect(self._before_render, app)
+            template_rendered.connect(self._after_render, app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics)
+
+    def _before_request(self):
+        g._request_stats = RequestStats(request.endpoint or 'unknown')
+
+    def _before_render(self, sender, template, context, **extra):
+        stats = _current_stats()
+        if stats is not None:
+            stats.template_started = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        stats = _current_stats()
+        if stats is not None and stats.template_started is not None:
+            stats.template_time += time.perf_counter() - stats.template_started
+            stats.template_started = None
+
+    def _after_request(self, response):
+        stats = _current_stats()
+        if stats is None:
+            return response
+        if self.app.debug:
+            if response.is_streamed:
+                # A streamed body renders and queries after this hook; read it
+                # now so the headers cover the whole page.
+                response.make_sequence()
+            response.headers['X-SQL-Statements'] = str(stats.sql_count)
+            response.headers['X-SQL-Time-Ms'] = '%.2f' % (stats.sql_time * 1000)
+            response.headers['X-Template-Time-Ms'] = '%.2f' % (stats.template_time * 1000)
+            response.headers['X-Response-Time-Ms'] = '%.2f' % ((time.perf_counter() - stats.started) * 1000)
+        # Streamed bodies keep querying after this hook, so totals are
+        # recorded once the response is closed.
+        response.call_on_close(lambda: self._record(stats))
+        return response
+
+    def _record(self, stats):
+        wall_time = time.perf_counter() - stats.started
+        n_plus_one = stats.sql_count > self.app.config['PROFILER_N_PLUS_ONE_THRESHOLD']
+        if n_plus_one:
+            self.app.logger.warning('%s issued %d SQL statements (possible N+1 queries)',
+                                    stats.endpoint, stats.sql_count)
+        with self.lock:
+            totals = self.totals[stats.endpoint]
+            totals['requests'] += 1
+            totals['seconds'] += wall_time
+            totals['sql_statements'] += stats.sql_count
+            totals['sql_seconds'] += stats.sql_time
+            totals['template_seconds'] += stats.template_time
+            totals['n_plus_one'] += n_plus_one
+
+    def metrics(self):
+        metrics = (
+            ('fyyur_requests_total', 'requests', 'counter', 'Requests served.'),
+            ('fyyur_request_seconds_total', 'seconds', 'counter', 'Wall time spent serving requests.'),
+            ('fyyur_sql_statements_total', 'sql_statements', 'counter', 'SQL statements executed.'),
+            ('fyyur_sql_seconds_total', 'sql_seconds', 'counter', 'Time spent executing SQL.'),
+            ('fyyur_template_seconds_total', 'template_seconds', 'counter', 'Time spent rendering templates.'),
+            ('fyyur_n_plus_one_requests_total', 'n_plus_one', 'counter',
+             'Requests over the N+1 statement threshold.'),
+        )
+        with self.lock:
+            totals = {endpoint: dict(values) for endpoint, values in self.totals.items()}
+        lines = []
+        for name, key, kind, help_text in metrics:
+            lines.append('# HELP %s %s' % (name, help_text))
+            lines.append('# TYPE %s %s' % (name, kind))
+            for endpoint in sorted(totals):
+                value = totals[endpoint].get(key, 0)
+                lines.append('%s{endpoint="%s"} %s' % (name, _label(endpoint), repr(float(value))))
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
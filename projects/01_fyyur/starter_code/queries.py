@@ -0,0 +1,186 @@
+from datetime import datetime, timezone
+from itertools import groupby
+
+import dateutil.parser
+from sqlalchemy import and_, or_, func
+
+from models import db, Venue, Artist, Show, Genre
+
+PAST_SHOWS_PER_PAGE = 12
+SHOWS_PER_PAGE = 30
+
+
+#----------------------------------------------------------------------------#
+# Helpers.
+#----------------------------------------------------------------------------#
+
+def utc_now():
+    """Captured once per request so every query splits shows at the same instant."""
+    return datetime.now(timezone.utc)
+
+
+def filter_by_genre(query, model, genre):
+    """Restrict a Venue or Artist query to one genre through the association index."""
+    if not genre:
+        return query
+    return query.join(model.genres).filter(Genre.name == genre)
+
+
+#----------------------------------------------------------------------------#
+# Venues.
+#----------------------------------------------------------------------------#
+
+def venues_by_area(now=None, genre=None):
+    """
+    Build the area -> venues -> upcoming show count listing in one statement.
+    Shows are outer joined on the upcoming condition so venues without any
+    upcoming show still appear with a count of 0.
+    """
+    now = now or utc_now()
+    rows = filter_by_genre(db.session.query(
+        Venue.city,
+        Venue.state,
+        Venue.id,
+        Venue.name,
+        func.count(Show.id).label('num_upcoming_shows')
+    ), Venue, genre).outerjoin(
+        Show, and_(Show.venue_id == Venue.id, Show.start_time >= now)
+    ).group_by(
+        Venue.id, Venue.city, Venue.state, Venue.name
+    ).order_by(
+        Venue.state, Venue.city, Venue.id
+    ).all()
+
+    areas = []
+    for (city, state), venues_in_area in groupby(rows, key=lambda row: (row.city, row.state)):
+        areas.append({
+            'city': city,
+            'state': state,
+            'venues': [{'id': row.id,
+                        'name': row.name,
+                        'num_upcoming_shows': row.num_upcoming_shows}
+                       for row in venues_in_area]
+        })
+    return areas
+
+
+#----------------------------------------------------------------------------#
+# Detail pages.
+#----------------------------------------------------------------------------#
+
+def _show_projection(obj):
+    """Only the columns the detail templates render, keyed by their template names."""
+    if isinstance(obj, Venue):
+        return Show.venue_id == obj.id, Artist, Show.artist_id == Artist.id, [
+            Show.artist_id.label('artist_id'),
+            Artist.name.label('artist_name'),
+            Artist.image_link.label('artist_image_link'),
+            Show.start_time]
+    return Show.artist_id == obj.id, Venue, Show.venue_id == Venue.id, [
+        Show.venue_id.label('venue_id'),
+        Venue.name.label('venue_name'),
+        Venue.image_link.label('venue_image_link'),
+        Show.start_time]
+
+
+def _show_rows(query):
+    return [row._asdict() for row in query]
+
+
+def set_past_and_upcoming_shows(obj, past_page=1, now=None):
+    """
+    Attach the upcoming shows and one page of past shows to a Venue or Artist.
+    Each partition is a single joined projection split at the same captured
+    instant, so the cost is three statements however long the history is.
+    """
+    now = now or utc_now()
+    past_page = max(past_page, 1)
+    owner_filter, other, join_condition, columns = _show_projection(obj)
+    shows = db.session.query(*columns).join(other, join_condition).filter(owner_filter)
+
+    obj.upcoming_shows = _show_rows(
+        shows.filter(Show.start_time >= now).order_by(Show.start_time, Show.id))
+    obj.upcoming_shows_count = len(obj.upcoming_shows)
+
+    obj.past_shows_count = db.session.query(func.count(Show.id)) \
+        .filter(owner_filter, Show.start_time < now).scalar()
+    obj.past_shows = _show_rows(
+        shows.filter(Show.start_time < now)
+        .order_by(Show.start_time.desc(), Show.id.desc())
+        .limit(PAST_SHOWS_PER_PAGE)
+        .offset((past_page - 1) * PAST_SHOWS_PER_PAGE))
+    obj.past_page = past_page
+    obj.past_shows_has_more = past_page * PAST_SHOWS_PER_PAGE < obj.past_shows_count
+
+
+#----------------------------------------------------------------------------#
+# Shows.
+#----------------------------------------------------------------------------#
+
+def encode_cursor(start_time, show_id):
+    return '%s_%d' % (start_time.isoformat(), show_id)
+
+
+def decode_cursor(cursor):
+    """Raises ValueError on a malformed cursor."""
+    start_time, show_id = cursor.rsplit('_', 1)
+    return dateutil.parser.parse(start_time), int(show_id)
+
+
+class ShowPage:
+    """
+    One keyset page of the /shows listing. Rows are produced while the
+    template iterates, and next_cursor is only known once iteration is done,
+    which is when the template renders its pagination link.
+    """
+
+    def __init__(self, query, limit):
+        self.query = query
+        self.limit = limit
+        self.next_cursor = None
+
+    def __iter__(self):
+        # One extra row tells us whether there is a next page.
+        for count, row in enumerate(self.query.limit(self.limit + 1).yield_per(self.limit)):
+            if count == self.limit:
+                self.next_cursor = encode_cursor(last.start_time, last.id)
+                return
+            last = row
+            yield {
+                "venue_id": row.venue_id,
+                "venue_name": row.venue_name,
+                "artist_id": row.artist_id,
+                "artist_name": row.artist_name,
+                "artist_image_link": row.artist_image_link,
+                "start_time": row.start_time
+            }
+
+
+def shows_page(after=None, start=None, end=None, venue_id=None, artist_id=None,
+               limit=SHOWS_PER_PAGE):
+    """
+    Shows ordered by (start_time, id) with their venue and artist columns
+    joined in, starting strictly after the `after` cursor.
+    """
+    query = db.session.query(
+        Show.id,
+        Show.start_time,
+        Show.venue_id,
+        Venue.name.label('venue_name'),
+        Show.artist_id,
+        Artist.name.label('artist_name'),
+        Artist.image_link.label('artist_image_link')
+    ).join(Venue, Show.venue_id == Venue.id).join(Artist, Show.artist_id == Artist.id)
+    if start is not None:
+        query = query.filter(Show.start_time >= start)
+    if end is not None:
+        query = query.filter(Show.start_time < end)
+    if venue_id is not None:
+        query = query.filter(Show.venue_id == venue_id)
+    if artist_id is not None:
+        query = query.filter(Show.artist_id == artist_id)
+    if after is not None:
+        after_time, after_id = after
+        query = query.filter(or_(Show.start_time > after_time,
+                                 and_(Show.start_time == after_time, Show.id > after_id)))
+    return ShowPage(query.order_by(Show.start_time, Show.id), limit)
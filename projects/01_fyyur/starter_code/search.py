@@ -0,0 +1,129 @@
+from collections import defaultdict
+
+from sqlalchemy import event, func
+
+from models import db, Venue, Artist, Show
+from queries import utc_now, filter_by_genre
+
+SEARCH_RESULT_LIMIT = 50
+
+
+#----------------------------------------------------------------------------#
+# In-process fallback index.
+#----------------------------------------------------------------------------#
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def rank_key(name, term):
+    """Exact matches first, then prefixes, then word starts, then earliest hit."""
+    lowered = name.lower()
+    position = lowered.find(term)
+    word_start = position == 0 or not lowered[position - 1].isalnum()
+    return (lowered != term, position != 0, not word_start, position, len(name), name)
+
+
+class TrigramIndex:
+    """
+    Trigram -> ids inverted index over a model's name column, mirroring what
+    pg_trgm does for PostgreSQL. Used when the database has no trigram
+    support (SQLite in development and tests). Writes to the model mark the
+    index stale and it is rebuilt with a single query on the next search.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.names = {}
+        self.postings = defaultdict(set)
+        self.stale = True
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, event_name, self.invalidate)
+
+    def invalidate(self, *args):
+        self.stale = True
+
+    def rebuild(self):
+        self.names = {}
+        self.postings = defaultdict(set)
+        for id, name in db.session.query(self.model.id, self.model.name):
+            name = name or ''
+            self.names[id] = name
+            for gram in trigrams(name.lower()):
+                self.postings[gram].add(id)
+        self.stale = False
+
+    def search(self, term, limit, allowed=None):
+        if self.stale:
+            self.rebuild()
+        term = term.lower()
+        if len(term) < 3:
+            candidates = self.names
+        else:
+            postings = sorted((self.postings.get(gram, set()) for gram in trigrams(term)),
+                              key=len)
+            candidates = set.intersection(*postings)
+        if allowed is not None:
+            candidates = allowed.intersection(candidates)
+        matches = [(id, self.names[id]) for id in candidates
+                   if term in self.names[id].lower()]
+        matches.sort(key=lambda match: rank_key(match[1], term))
+        return len(matches), matches[:limit]
+
+
+fallback_indexes = {Venue: TrigramIndex(Venue), Artist: TrigramIndex(Artist)}
+
+
+#----------------------------------------------------------------------------#
+# Search.
+#----------------------------------------------------------------------------#
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _postgres_search(model, term, limit, genre):
+    rows = filter_by_genre(db.session.query(
+        model.id,
+        model.name,
+        func.count(model.id).over().label('total')
+    ), model, genre).filter(
+        model.name.ilike('%' + escape_like(term) + '%', escape='\\')
+    ).order_by(
+        func.similarity(model.name, term).desc(), model.name, model.id
+    ).limit(limit).all()
+    total = rows[0].total if rows else 0
+    return total, [(row.id, row.name) for row in rows]
+
+
+def upcoming_show_counts(owner_column, ids, now):
+    if not ids:
+        return {}
+    return dict(db.session.query(owner_column, func.count(Show.id))
+                .filter(owner_column.in_(ids), Show.start_time >= now)
+                .group_by(owner_column))
+
+
+def search(model, term, genre=None, limit=SEARCH_RESULT_LIMIT, now=None):
+    """
+    Ranked case-insensitive substring search on Venue or Artist names,
+    optionally restricted to one genre.
+    Returns the total match count and at most `limit` results, each with its
+    upcoming show count fetched in one grouped query.
+    """
+    term = (term or '').strip()
+    if db.session.get_bind().dialect.name == 'postgresql':
+        total, matches = _postgres_search(model, term, limit, genre)
+    else:
+        allowed = None
+        if genre:
+            allowed = {id for id, in filter_by_genre(db.session.query(model.id), model, genre)}
+        total, matches = fallback_indexes[model].search(term, limit, allowed)
+    owner_column = Show.venue_id if model is Venue else Show.artist_id
+    counts = upcoming_show_counts(owner_column, [id for id, _ in matches], now or utc_now())
+    return {
+        "count": total,
+        "data": [{"id": id,
+                  "name": name,
+                  "num_upcoming_shows": counts.get(id, 0)} for id, name in matches]
+    }
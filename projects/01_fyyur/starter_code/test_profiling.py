@@ -0,0 +1,62 @@
+"""
+Request profiler tests: the X-* debug headers and /metrics totals must
+cover pages that are streamed as well as pages rendered in one go.
+
+    $ python test_profiling.py
+"""
+import os
+import unittest
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from app import app, db, profiler
+from models import Venue, Artist, Show
+
+
+class RequestProfilerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.context = app.app_context()
+        self.context.push()
+        db.create_all()
+        now = datetime.now(timezone.utc)
+        venue = Venue(name='Profiled Venue', city='Austin', state='TX')
+        artist = Artist(name='Profiled Artist', city='Austin', state='TX')
+        db.session.add_all([venue, artist] + [
+            Show(venue=venue, artist=artist, start_time=now + timedelta(days=days))
+            for days in (-1, 1)
+        ])
+        db.session.commit()
+        self.debug = app.debug
+        profiler.totals.clear()
+
+    def tearDown(self):
+        app.debug = self.debug
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_debug_headers_cover_streamed_page(self):
+        app.debug = True
+        response = app.test_client().get('/shows')
+
+        self.assertIn(b'Profiled Artist', response.data)
+        self.assertGreater(int(response.headers['X-SQL-Statements']), 0)
+        self.assertGreater(float(response.headers['X-Template-Time-Ms']), 0)
+
+    def test_totals_cover_streamed_page(self):
+        app.debug = False
+        response = app.test_client().get('/shows')
+        response.get_data()
+        response.close()
+
+        totals = profiler.totals['shows']
+        self.assertEqual(totals['requests'], 1)
+        self.assertGreater(totals['sql_statements'], 0)
+        self.assertGreater(totals['template_seconds'], 0)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
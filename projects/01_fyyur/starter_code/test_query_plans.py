@@ -0,0 +1,115 @@
+"""
+Query plan regression tests: the queries behind the venue and artist pages
+and the /shows listing must reach Show rows through an index, never a
+sequential scan of the table.
+
+Runs on an in-memory SQLite database by default. To check PostgreSQL plans,
+point DATABASE_URL at a throwaway database (its tables are created and
+dropped by the tests):
+
+    $ python test_query_plans.py
+    $ DATABASE_URL=postgresql://localhost:5432/fyyur_test python test_query_plans.py
+"""
+import os
+import re
+import unittest
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from sqlalchemy import event
+
+from app import app, db
+from models import Venue, Artist, Show
+from queries import venues_by_area, set_past_and_upcoming_shows, shows_page
+
+SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?"?(\w+)"?(.*)$')
+
+
+def postgres_seq_scans(plan):
+    if plan['Node Type'] == 'Seq Scan':
+        yield plan['Relation Name']
+    for child in plan.get('Plans', ()):
+        yield from postgres_seq_scans(child)
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    """Fails when a key Fyyur query falls back to scanning the Show table."""
+
+    def setUp(self):
+        self.context = app.app_context()
+        self.context.push()
+        db.create_all()
+        now = datetime.now(timezone.utc)
+        self.venue = Venue(name='Plan Venue', city='Austin', state='TX')
+        self.artist = Artist(name='Plan Artist', city='Austin', state='TX')
+        db.session.add_all([self.venue, self.artist] + [
+            Show(venue=self.venue, artist=self.artist, start_time=now + timedelta(days=days))
+            for days in (-30, -1, 1, 30)
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def selects_run_by(self, function, *args, **kwargs):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append((statement, parameters))
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            result = function(*args, **kwargs)
+            if result is not None and not isinstance(result, list):
+                list(result)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertTrue(statements)
+        return statements
+
+    def sequential_scans(self, statement, parameters):
+        cursor = db.session.connection().connection.cursor()
+        if db.engine.dialect.name == 'postgresql':
+            # Tiny test tables make a seq scan the cheapest plan; with seq
+            # scans priced out one is only chosen when no index applies.
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+            return set(postgres_seq_scans(cursor.fetchone()[0][0]['Plan']))
+        cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+        scanned = set()
+        for row in cursor.fetchall():
+            match = SQLITE_SCAN_RE.match(row[-1])
+            if match and 'INDEX' not in match.group(2):
+                scanned.add(match.group(1))
+        return scanned
+
+    def assertShowTableNotScanned(self, function, *args, **kwargs):
+        for statement, parameters in self.selects_run_by(function, *args, **kwargs):
+            self.assertNotIn('Show', self.sequential_scans(statement, parameters),
+                             msg='sequential scan of Show in:\n' + statement)
+
+    def test_venue_detail_shows(self):
+        self.assertShowTableNotScanned(set_past_and_upcoming_shows, self.venue)
+
+    def test_artist_detail_shows(self):
+        self.assertShowTableNotScanned(set_past_and_upcoming_shows, self.artist)
+
+    def test_venues_by_area(self):
+        self.assertShowTableNotScanned(venues_by_area)
+
+    def test_shows_listing(self):
+        self.assertShowTableNotScanned(shows_page)
+
+    def test_shows_listing_for_venue(self):
+        self.assertShowTableNotScanned(shows_page, venue_id=self.venue.id)
+
+    def test_shows_listing_for_artist(self):
+        self.assertShowTableNotScanned(shows_page, artist_id=self.artist.id)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,210 @@
+"""
+Throughput and latency of the question listing, category, search and quiz
+endpoints of create_app() as the question bank grows from 1k to 1M rows
+spread over many categories.
+
+Runs against a SQLite file in a temporary directory, so no database server
+is needed; the bank is topped up in place between sizes. Save a run with
+--output and compare a later run against it with --compare.
+
+Run from the backend directory:
+
+    $ python -m benchmarks.bench_api --output before.json
+    $ python -m benchmarks.bench_api --sizes 1000 100000 --compare before.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(
+    tempfile.mkdtemp(), 'bench_api.db'))
+
+from flaskr import create_app
+from flaskr.bulk import IMPORT_CHUNK_SIZE, insert_batch
+from flaskr.search import question_index
+from models import db, Question, Category
+
+SIZES = (1000, 100000, 1000000)
+CATEGORIES = 50
+ITERATIONS = 50
+HISTORY_LENGTHS = (0, 10, 100, 1000)
+# Slower than this ratio against --compare is flagged.
+REGRESSION_RATIO = 1.2
+SUBJECTS = ['river', 'painter', 'planet', 'composer', 'empire', 'element',
+            'mountain', 'novel', 'treaty', 'bridge', 'island', 'festival']
+VERBS = ['discovered', 'named', 'built', 'painted', 'written', 'crossed']
+
+
+def seed_categories(count):
+    if not Category.query.count():
+        db.session.add_all([Category('Category %d' % i) for i in range(count)])
+        db.session.commit()
+
+
+def top_up(size, categories, rng):
+    '''adds questions until the bank holds `size` of them'''
+    existing = Question.query.count()
+    batch = []
+    for i in range(existing, size):
+        batch.append({
+            'question': 'Which %s was first %s in %d?' % (
+                rng.choice(SUBJECTS), rng.choice(VERBS), rng.randint(1000, 2020)),
+            'answer': 'Answer %d' % i,
+            'category': rng.randint(1, categories),
+            'difficulty': rng.randint(1, 5),
+        })
+        if len(batch) == IMPORT_CHUNK_SIZE * 10:
+            insert_batch(batch)
+            batch = []
+    if batch:
+        insert_batch(batch)
+    db.session.commit()
+    question_index.invalidate()
+
+
+def endpoints(size, categories, ids, rng):
+    '''(name, method, path, json body builder) for one bank size'''
+    last_page = max(size // 10, 1)
+    yield 'questions', 'GET', '/questions', None
+    yield 'questions deep page', 'GET', '/questions?page=%d' % last_page, None
+    yield 'questions deep after_id', 'GET', \
+        '/questions?after_id=%d' % ids[-11], None
+    yield 'category questions', 'GET', \
+        lambda: '/categories/%d/questions' % rng.randint(1, categories), None
+    yield 'search', 'POST', '/questions', \
+        lambda: {'searchTerm': rng.choice(SUBJECTS)}
+    yield 'search phrase', 'POST', '/questions', \
+        lambda: {'searchTerm': 'first %s' % rng.choice(VERBS)}
+    for length in HISTORY_LENGTHS:
+        if length > size // 2:
+            continue
+        for category in (0, 1):
+            yield 'quiz %s history %d' % ('all' if category == 0 else 'category', length), \
+                'POST', '/quizzes', lambda length=length, category=category: {
+                    'previous_questions': rng.sample(ids, length),
+                    'quiz_category': {'id': category}}
+
+
+def request(client, method, path, body):
+    path = path() if callable(path) else path
+    response = client.open(path, method=method, json=body() if body else None)
+    # listings are streamed; read them to the end so encoding is timed too
+    response.get_data()
+    return response.status_code
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def measure(client, method, path, body, iterations):
+    request(client, method, path, body)  # warm up
+    timings = []
+    statuses = set()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        statuses.add(request(client, method, path, body))
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'requests_per_second': 1000 * len(timings) / sum(timings),
+        'p50_ms': percentile(timings, 0.50),
+        'p95_ms': percentile(timings, 0.95),
+        'p99_ms': percentile(timings, 0.99),
+        'mean_ms': statistics.mean(timings),
+        'status': sorted(statuses),
+    }
+
+
+def row_key(size, name):
+    return '%d %s' % (size, name)
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    app = create_app()
+    client = app.test_client()
+    results = {}
+    with app.app_context():
+        seed_categories(args.categories)
+        for size in sorted(args.sizes):
+            start = time.perf_counter()
+            top_up(size, args.categories, rng)
+            print('%d questions (seeded in %.1fs)' % (size, time.perf_counter() - start))
+            print(HEADER)
+            ids = [id for id, in db.session.query(Question.id).order_by(Question.id)]
+            db.session.remove()
+            for name, method, path, body in endpoints(size, args.categories, ids, rng):
+                if args.only and name not in args.only:
+                    continue
+                result = measure(client, method, path, body, args.iterations)
+                results[row_key(size, name)] = dict(result, size=size, endpoint=name)
+                print_row(name, result)
+            del ids
+    return {
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':')[0],
+        'categories': args.categories,
+        'iterations': args.iterations,
+        'python': platform.python_version(),
+        'time': datetime.now(timezone.utc).isoformat(),
+        'results': results,
+    }
+
+
+HEADER = '  %-28s %9s %8s %8s %8s' % ('endpoint', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms')
+
+
+def print_row(name, row):
+    print('  %-28s %9.1f %8.2f %8.2f %8.2f' % (
+        name, row['requests_per_second'], row['p50_ms'], row['p95_ms'],
+        row['p99_ms']), flush=True)
+
+
+def compare(baseline, current):
+    print()
+    print('%-36s %18s %18s' % ('size endpoint', 'p50 ms', 'p95 ms'))
+    regressions = []
+    for key, row in current['results'].items():
+        old = baseline['results'].get(key)
+        if old is None:
+            continue
+        slower = row['p95_ms'] > old['p95_ms'] * REGRESSION_RATIO
+        print('%-36s %8.2f -> %7.2f %8.2f -> %7.2f%s' % (
+            key, old['p50_ms'], row['p50_ms'], old['p95_ms'], row['p95_ms'],
+            '  <-- regression' if slower else ''))
+        if slower:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--categories', type=int, default=CATEGORIES)
+    parser.add_argument('--iterations', type=int, default=ITERATIONS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', metavar='ENDPOINT',
+                        help='endpoint names to run (quote names with spaces)')
+    parser.add_argument('--output', help='save the results as JSON')
+    parser.add_argument('--compare', help='a previous --output file to compare against')
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results)
+        if regressions:
+            print('\n%d endpoint(s) regressed: %s' % (len(regressions), ', '.join(regressions)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Cost of one /quizzes step across question bank sizes and history lengths,
+comparing the old load-filter-choose selection with next_question().
+
+Run from the backend directory:
+
+    $ DATABASE_URL=sqlite:// python -m benchmarks.bench_quizzes
+"""
+import os
+import random
+import time
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from flaskr import create_app
+from flaskr.quiz import next_question
+from models import db, Question, Category
+
+BANK_SIZES = (1000, 10000, 100000)
+HISTORY_LENGTHS = (0, 10, 100, 1000)
+CATEGORIES = 6
+DRAWS = 20
+
+
+def legacy_next_question(category_id, previous_questions):
+    if category_id == 0:
+        candidates = Question.query.all()
+    else:
+        candidates = Question.query.filter_by(category=category_id).all()
+    remaining_candidates = [candidate for candidate in candidates
+                            if candidate.id not in previous_questions]
+    return random.choice(remaining_candidates) if remaining_candidates else None
+
+
+def seed(size):
+    db.session.query(Question).delete()
+    db.session.commit()
+    db.session.execute(Question.__table__.insert(), [
+        {'question': 'Question %d' % i, 'answer': 'Answer %d' % i,
+         'category': i % CATEGORIES + 1, 'difficulty': i % 5 + 1}
+        for i in range(size)
+    ])
+    db.session.commit()
+
+
+def time_draws(select, category_id, history):
+    start = time.perf_counter()
+    for _ in range(DRAWS):
+        select(category_id, history)
+        db.session.expunge_all()
+    return (time.perf_counter() - start) * 1000 / DRAWS
+
+
+def main():
+    random.seed(0)
+    app = create_app()
+    with app.app_context():
+        if not Category.query.count():
+            db.session.add_all([Category('Category %d' % i) for i in range(CATEGORIES)])
+            db.session.commit()
+        print('%8s %8s %10s %14s %14s' % ('bank', 'history', 'category', 'before ms', 'after ms'))
+        for size in BANK_SIZES:
+            seed(size)
+            ids = [id for id, in db.session.query(Question.id)]
+            for history_length in HISTORY_LENGTHS:
+                history = random.sample(ids, history_length)
+                for category_id in (0, 1):
+                    before = time_draws(legacy_next_question, category_id, history)
+                    after = time_draws(next_question, category_id, history)
+                    print('%8d %8d %10d %14.2f %14.2f' % (size, history_length, category_id, before, after))
+
+
+if __name__ == '__main__':
+    main()
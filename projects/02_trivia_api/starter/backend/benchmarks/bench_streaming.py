@@ -0,0 +1,94 @@
+"""
+Peak memory of a 100k-question GET /questions response, built with
+jsonify (every dict and the whole JSON string in memory) versus streamed
+with stream_json() over yield_per.
+
+Each variant runs in a fresh interpreter against the same SQLite file and
+reports how far its peak RSS grew while producing and consuming the
+response.
+
+Run from the backend directory:
+
+    $ python -m benchmarks.bench_streaming
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BANK_SIZE = 100000
+CATEGORIES = 6
+VARIANTS = ('jsonify', 'stream_json')
+
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def seed(path):
+    os.environ['DATABASE_URL'] = 'sqlite:///' + path
+    from flaskr import create_app
+    from models import db, Question, Category
+    app = create_app()
+    with app.app_context():
+        db.session.add_all([Category('Category %d' % i) for i in range(CATEGORIES)])
+        db.session.commit()
+        db.session.execute(Question.__table__.insert(), [
+            {'question': 'Question number %d, padded to a realistic length?' % i,
+             'answer': 'Answer %d' % i,
+             'category': i % CATEGORIES + 1, 'difficulty': i % 5 + 1}
+            for i in range(BANK_SIZE)
+        ])
+        db.session.commit()
+
+
+def run(variant):
+    from flask import jsonify
+    from flaskr import create_app
+    from flaskr.category_cache import category_cache
+    from models import Question
+
+    # lift the public per_page cap so one page holds the whole bank
+    app = create_app({'MAX_QUESTIONS_PER_PAGE': BANK_SIZE})
+    client = app.test_client()
+    # warm up imports, the connection and the category cache
+    client.get('/questions')
+    baseline = peak_rss_kb()
+    start = time.perf_counter()
+    if variant == 'jsonify':
+        with app.test_request_context():
+            questions = Question.query.order_by(Question.id).limit(BANK_SIZE).all()
+            response = jsonify({
+                'questions': [question.format() for question in questions],
+                'total_questions': len(questions),
+                'current_category': None,
+                'categories': category_cache.get()
+            })
+            size = len(response.get_data())
+    else:
+        response = client.get('/questions?per_page=%d' % BANK_SIZE, buffered=False)
+        size = sum(len(chunk) for chunk in response.response)
+        response.close()
+    seconds = time.perf_counter() - start
+    print('%-12s %10.1f %10.0f %12d' % (
+        variant, (peak_rss_kb() - baseline) / 1024, seconds * 1000, size))
+
+
+def main():
+    if len(sys.argv) == 3:
+        os.environ['DATABASE_URL'] = 'sqlite:///' + sys.argv[2]
+        run(sys.argv[1])
+        return
+    path = os.path.join(tempfile.mkdtemp(), 'bench_streaming.db')
+    seed(path)
+    print('%d questions' % BANK_SIZE)
+    print('%-12s %10s %10s %12s' % ('variant', 'peak +MB', 'ms', 'bytes'), flush=True)
+    for variant in VARIANTS:
+        subprocess.run([sys.executable, '-m', 'benchmarks.bench_streaming', variant, path],
+                       check=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,5 +12,5 @@ database_name = "trivia"
 database_path = "postgres://{}/{}".format('localhost:5432', database_name)
 
 # TODO IMPLEMENT DATABASE URL
-SQLALCHEMY_DATABASE_URI = database_path
+SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', database_path)
 SQLALCHEMY_TRACK_MODIFICATIONS = False
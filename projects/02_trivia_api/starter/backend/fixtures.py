@@ -0,0 +1,215 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+from sqlalchemy import event
+
+# the app reads its database from config at import time, so the test
+# database has to be chosen before flaskr is imported
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL',
+                                   'postgres://localhost:5432/trivia_test')
+os.environ['DATABASE_URL'] = TEST_DATABASE_URL
+
+from flaskr import create_app
+from flaskr.search import question_index
+from models import db, Category
+
+TRIVIA_PSQL = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'trivia.psql')
+COPY_RE = re.compile(r'^COPY (?:\w+\.)?(\w+) \(([^)]*)\) FROM stdin;$')
+COPY_ESCAPE_RE = re.compile(r'\\(.)')
+COPY_ESCAPES = {'t': '\t', 'n': '\n', 'r': '\r', '\\': '\\'}
+
+
+'''
+read_psql_fixtures(path=TRIVIA_PSQL)
+    the rows of every COPY block in a pg_dump file, as
+    {table name: [row dict, ...]} in the order they appear, so an SQLite
+    test database can hold the same data as one restored from trivia.psql
+'''
+
+
+def read_psql_fixtures(path=TRIVIA_PSQL):
+    tables = {}
+    rows = None
+    with open(path, encoding='utf-8') as dump:
+        for line in dump:
+            line = line.rstrip('\n')
+            if rows is None:
+                match = COPY_RE.match(line)
+                if match:
+                    columns = [column.strip() for column in match.group(2).split(',')]
+                    rows = tables.setdefault(match.group(1), [])
+            elif line == '\\.':
+                rows = None
+            else:
+                rows.append({
+                    column: None if value == '\\N' else COPY_ESCAPE_RE.sub(
+                        lambda m: COPY_ESCAPES.get(m.group(1), m.group(1)), value)
+                    for column, value in zip(columns, line.split('\t'))
+                })
+    return tables
+
+
+'''
+seed_fixtures(path=TRIVIA_PSQL)
+    inserts the trivia.psql rows into an empty database, converting each
+    value to its column's type, and moves PostgreSQL's id sequences past
+    them
+'''
+
+
+def seed_fixtures(path=TRIVIA_PSQL):
+    for name, rows in read_psql_fixtures(path).items():
+        table = db.metadata.tables[name]
+        types = {column.name: column.type.python_type for column in table.columns}
+        db.session.execute(table.insert(), [
+            {column: value if value is None else types[column](value)
+             for column, value in row.items()}
+            for row in rows
+        ])
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(
+                "SELECT setval(pg_get_serial_sequence('{0}', 'id'), "
+                "(SELECT max(id) FROM {0}))".format(name))
+    db.session.commit()
+
+
+def _begin_sqlite_transactions(engine):
+    # pysqlite only opens a transaction before DML, so SAVEPOINTs would run
+    # in autocommit mode and survive the rollback; have SQLAlchemy emit
+    # BEGIN itself instead, as in the SQLAlchemy docs' SQLite recipe.
+    def disable_driver_transactions(dbapi_connection, connection_record=None):
+        dbapi_connection.isolation_level = None
+
+    event.listen(engine, 'connect', disable_driver_transactions)
+    event.listen(engine, 'begin', lambda connection: connection.execute('BEGIN'))
+    with engine.connect() as connection:
+        # an in-memory database lives on the one connection already open
+        disable_driver_transactions(connection.connection.connection)
+
+
+_app = None
+
+
+'''
+shared_app()
+    the test app, created once per process: create_app() builds the schema,
+    and an empty database is seeded from trivia.psql, so an in-memory
+    SQLite database (TEST_DATABASE_URL=sqlite://) needs no setup at all
+'''
+
+
+def shared_app():
+    global _app
+    if _app is None:
+        _app = create_app()
+        with _app.app_context():
+            if db.engine.dialect.name == 'sqlite':
+                _begin_sqlite_transactions(db.engine)
+            if not Category.query.count():
+                seed_fixtures()
+            db.session.remove()
+    return _app
+
+
+'''
+TransactionalTestCase
+    runs each test inside a transaction that is rolled back afterwards, so
+    tests see the seeded data however earlier tests changed it. the app's
+    commits only release a SAVEPOINT, which is reopened straight away.
+    `self.client` is the app's test_client factory.
+'''
+
+
+class TransactionalTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = shared_app()
+        cls.client = cls.app.test_client
+
+    def setUp(self):
+        # requests reuse this app context, so Flask-SQLAlchemy doesn't
+        # remove the test's session at the end of each one
+        self.context = self.app.app_context()
+        self.context.push()
+        self.connection = db.engine.connect()
+        self.transaction = self.connection.begin()
+        self.session = db.create_scoped_session(
+            options={'bind': self.connection, 'binds': {}})
+        self.session.begin_nested()
+
+        def restart_savepoint(session, transaction):
+            if transaction.nested and not transaction._parent.nested:
+                session.expire_all()
+                session.begin_nested()
+
+        self.restart_savepoint = restart_savepoint
+        event.listen(self.session(), 'after_transaction_end', restart_savepoint)
+        self.app_session = db.session
+        db.session = self.session
+
+    def tearDown(self):
+        event.remove(self.session(), 'after_transaction_end', self.restart_savepoint)
+        self.session.rollback()
+        self.session.remove()
+        db.session = self.app_session
+        self.transaction.rollback()
+        self.connection.close()
+        # the search index may hold questions that were rolled back
+        question_index.invalidate()
+        self.context.pop()
+
+
+def _tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _tests(test)
+        else:
+            yield test
+
+
+'''
+shard(suite, index, count)
+    every count-th test of suite by test id, starting at index, so count
+    processes given indexes 0 to count - 1 run every test exactly once
+'''
+
+
+def shard(suite, index, count):
+    tests = sorted(_tests(suite), key=lambda test: test.id())
+    return unittest.TestSuite(tests[index::count])
+
+
+'''
+main()
+    unittest.main() for the test modules, plus --processes N to run the
+    tests split over N processes (each with its own in-memory database
+    under SQLite) and --shard I/N to run one of those parts.
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-v', '--verbose', action='store_true')
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--shard', help='I/N: run part I of N (from 0)')
+    args = parser.parse_args()
+    verbosity = 2 if args.verbose else 1
+
+    if args.processes > 1:
+        command = [sys.executable, sys.argv[0]] + (['-v'] if args.verbose else [])
+        workers = [subprocess.Popen(command + ['--shard', '%d/%d' % (index, args.processes)])
+                   for index in range(args.processes)]
+        sys.exit(max(worker.wait() for worker in workers))
+
+    suite = unittest.defaultTestLoader.loadTestsFromModule(sys.modules['__main__'])
+    if args.shard:
+        index, count = (int(part) for part in args.shard.split('/'))
+        suite = shard(suite, index, count)
+    result = unittest.TextTestRunner(verbosity=verbosity).run(suite)
+    sys.exit(not result.wasSuccessful())
@@ -1,19 +1,28 @@
 import os
 import sys
 
-from flask import Flask, request, abort, jsonify
+import click
+from flask import Flask, Response, request, abort, jsonify, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-import random
 
 from models import setup_db, Question, Category
-
-QUESTIONS_PER_PAGE = 10
+from .pagination import (QUESTIONS_PER_PAGE, MAX_QUESTIONS_PER_PAGE,
+                         page_query, count_query)
+from .quiz import MAX_QUIZ_PREFETCH, next_question, sample_questions
+from .quiz_sessions import quiz_sessions
+from .category_cache import category_cache
+from .bulk import IMPORT_CHUNK_SIZE, IMPORT_FORMATS, import_questions, export_questions
+from .search import search_questions
+from .streaming import STREAM_CHUNK_SIZE, stream_json
 
 
 def create_app(test_config=None):
     # create and configure the app
     app = Flask(__name__)
+    app.config['MAX_QUESTIONS_PER_PAGE'] = MAX_QUESTIONS_PER_PAGE
+    if test_config:
+        app.config.from_mapping(test_config)
     setup_db(app)
 
     '''
@@ -46,12 +55,13 @@ def create_app(test_config=None):
 
     @app.route('/categories')
     def get_categories():
-        categories = {}
-        for category in Category.query.all():
-            categories[category.id] = category.type
-        return jsonify({
+        categories, etag = category_cache.load()
+        response = jsonify({
             'categories': categories
         })
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
 
     '''
     @TODO:
@@ -66,24 +76,28 @@ def create_app(test_config=None):
     pages. Clicking on the page numbers should update the questions.
     '''
 
-    def paginate(selection):
-        page = request.args.get('page', 1, type=int)
-        start = (page - 1) * QUESTIONS_PER_PAGE
-        end = start + QUESTIONS_PER_PAGE
-        return selection[start:end]
+    def paginate(query):
+        '''returns (the page's formatted questions as a stream, total)'''
+        per_page = request.args.get('per_page', QUESTIONS_PER_PAGE, type=int)
+        page = page_query(
+            query,
+            page=request.args.get('page', 1, type=int),
+            after_id=request.args.get('after_id', type=int),
+            per_page=min(max(per_page, 1), app.config['MAX_QUESTIONS_PER_PAGE'])
+        )
+        questions = (question.format()
+                     for question in page.yield_per(STREAM_CHUNK_SIZE))
+        return questions, count_query(query)
 
     @app.route('/questions', methods=['GET'])
     def get_questions():
-        all_questions = Question.query.all()
-        paged_questions = [question.format()
-                           for question in paginate(all_questions)]
-        categories = {cat.id: cat.type for cat in Category.query.all()}
-        return jsonify({
-            'questions': paged_questions,
-            'total_questions': len(all_questions),
+        paged_questions, total_questions = paginate(Question.query)
+        categories = category_cache.get()
+        return stream_json({
+            'total_questions': total_questions,
             'current_category': None,
             'categories': categories
-        })
+        }, 'questions', paged_questions)
 
     '''
     @TODO:
@@ -98,11 +112,6 @@ def create_app(test_config=None):
     def delete_question(question_id):
         question = Question.query.filter_by(id=question_id).first_or_404()
         question.delete()
-
-        selection = Question.query.order_by(Question.id).all()
-        current_questions = paginate(selection)
-        formatted_questions = [question.format()
-                               for question in current_questions]
         return jsonify({
             'success': True
         })
@@ -139,16 +148,16 @@ def create_app(test_config=None):
     def add_or_search_question():
         data = request.get_json()
         if 'searchTerm' in data:
-            match_questions = Question.query.filter(
-                Question.question.ilike(f"%{data['searchTerm']}%")
-            ).all()
-            paginated_questions = paginate(match_questions)
+            paginated_questions, total_questions = search_questions(
+                data['searchTerm'],
+                page=request.args.get('page', 1, type=int)
+            )
             formatted_questions = [question.format()
                                    for question in paginated_questions]
             return jsonify({
                 'success': True,
                 'questions': formatted_questions,
-                'total_questions': Question.query.count(),
+                'total_questions': total_questions,
                 'current_category': [question.category
                                      for question in paginated_questions]
             })
@@ -161,7 +170,7 @@ def create_app(test_config=None):
             return jsonify({
                 'success': True,
                 'created': question.id,
-                'total_questions': Question.query.count()
+                'total_questions': count_query(Question.query)
             })
         except Exception as e:
             # print(sys.exc_info())
@@ -180,17 +189,13 @@ def create_app(test_config=None):
     @app.route('/categories/<int:category_id>/questions')
     def get_questions_by_category(category_id):
         category = Category.query.filter_by(id=category_id).first_or_404()
-        category_questions = Question.query.filter_by(
-            category=category.id
-        ).all()
-        paginated_questions = paginate(category_questions)
-        formatted_questions = [question.format()
-                               for question in paginated_questions]
-        return jsonify({
-            'questions': formatted_questions,
-            'total_questions': len(category_questions),
+        paginated_questions, total_questions = paginate(
+            Question.query.filter_by(category=category.id)
+        )
+        return stream_json({
+            'total_questions': total_questions,
             'current_category': category.type
-        })
+        }, 'questions', paginated_questions)
 
     '''
     @TODO:
@@ -204,6 +209,12 @@ def create_app(test_config=None):
     and shown whether they were correct or not.
     '''
 
+    def prefetch_count(count):
+        '''the number of quiz questions asked for, or a 422'''
+        if type(count) is not int or not 1 <= count <= MAX_QUIZ_PREFETCH:
+            abort(422)
+        return count
+
     @app.route('/quizzes', methods=['POST'])
     def play_quizzes():
         try:
@@ -214,14 +225,16 @@ def create_app(test_config=None):
         except KeyError:
             print(sys.exc_info())
             abort(422)
-        if category_id == 0:
-            candidates = Question.query.all()
-        else:
-            candidates = Question.query.filter_by(category=category_id).all()
-        remaining_candidates = [candidate for candidate in candidates
-                                if candidate.id not in previous_questions]
-        if remaining_candidates:
-            chosen_question = random.choice(remaining_candidates)
+        if 'count' in json_data:
+            count = prefetch_count(json_data['count'])
+            questions = [question.format() for question in
+                         sample_questions(category_id, previous_questions, count)]
+            return jsonify({
+                'question': questions[0] if questions else None,
+                'questions': questions
+            })
+        chosen_question = next_question(category_id, previous_questions)
+        if chosen_question:
             formatted_question = chosen_question.format()
         else:
             formatted_question = None
@@ -229,6 +242,71 @@ def create_app(test_config=None):
             'question': formatted_question
         })
 
+    @app.route('/quizzes/sessions', methods=['POST'])
+    def create_quiz_session():
+        try:
+            category_id = int(request.get_json()['quiz_category']['id'])
+        except (KeyError, TypeError, ValueError):
+            abort(422)
+        session = quiz_sessions.create(category_id)
+        return jsonify({
+            'success': True,
+            'session_id': session.id,
+            'expires_in': quiz_sessions.ttl
+        })
+
+    @app.route('/quizzes/sessions/<session_id>/next', methods=['POST'])
+    def next_session_question(session_id):
+        session = quiz_sessions.get(session_id)
+        if session is None:
+            abort(404)
+        json_data = request.get_json(silent=True) or {}
+        if 'count' in json_data:
+            questions = session.draw_many(prefetch_count(json_data['count']))
+            return jsonify({
+                'questions': [question.format() for question in questions],
+                'questions_seen': len(session.seen)
+            })
+        chosen_question = session.draw()
+        return jsonify({
+            'question': chosen_question.format() if chosen_question else None,
+            'questions_seen': len(session.seen)
+        })
+
+    @app.route('/quizzes/sessions/<session_id>', methods=['DELETE'])
+    def end_quiz_session(session_id):
+        if not quiz_sessions.delete(session_id):
+            abort(404)
+        return jsonify({
+            'success': True
+        })
+
+    @app.route('/questions/export')
+    def export_all_questions():
+        category_id = request.args.get('category', type=int)
+        return Response(stream_with_context(export_questions(category_id)),
+                        mimetype='application/x-ndjson')
+
+    @app.cli.command('import-questions')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'file_format', type=click.Choice(IMPORT_FORMATS),
+                  help='Defaults to the file extension.')
+    @click.option('--chunk-size', default=IMPORT_CHUNK_SIZE, show_default=True,
+                  help='Rows per insert statement and commit.')
+    def import_questions_command(path, file_format, chunk_size):
+        """Bulk load questions from a CSV or JSONL file."""
+        file_format = file_format or os.path.splitext(path)[1].lstrip('.')
+        if file_format not in IMPORT_FORMATS:
+            raise click.BadParameter(
+                f'cannot tell the format from the extension of {path!r}; '
+                f'use --format {" or ".join(IMPORT_FORMATS)}',
+                param_hint="'--format'")
+        with open(path, newline='', encoding='utf-8') as stream:
+            report = import_questions(stream, file_format, chunk_size)
+        for line_number, reason in report.errors:
+            click.echo(f'line {line_number}: {reason}', err=True)
+        click.echo(report.summary())
+
     '''
     @TODO:
     Create error handlers for all expected errors
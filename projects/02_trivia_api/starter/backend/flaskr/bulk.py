@@ -0,0 +1,180 @@
+import csv
+import io
+import json
+import re
+import time
+
+from models import db, Question, Category
+from .search import question_index
+
+IMPORT_CHUNK_SIZE = 1000
+EXPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+QUESTION_COLUMNS = ('question', 'answer', 'category', 'difficulty')
+IMPORT_FORMATS = ('csv', 'jsonl')
+# read_rows' stand-in for a JSONL line that doesn't parse
+INVALID_JSON = object()
+CSV_INTEGER_RE = re.compile(r'\s*[0-9]+\s*')
+
+
+'''
+read_rows(stream, format)
+    yields (line number, row dict) from a CSV file with a header row or a
+    JSONL file with one question object per line, without reading the
+    whole file first; a JSONL line that isn't JSON yields INVALID_JSON
+'''
+
+
+def read_rows(stream, format):
+    if format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif format == 'jsonl':
+        for line_number, line in enumerate(stream, 1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError:
+                    yield line_number, INVALID_JSON
+    else:
+        raise ValueError(f'unknown format {format!r}')
+
+
+'''
+validate_row(row, category_ids, format)
+    returns the row as insert parameters, or raises ValueError naming the
+    first problem found. category and difficulty must be JSON integers in
+    a JSONL row (not booleans or floats) and unsigned whole numbers in a
+    CSV row, so nothing is silently truncated
+'''
+
+
+def _integer(value, format):
+    if format == 'csv':
+        if isinstance(value, str) and CSV_INTEGER_RE.fullmatch(value):
+            return int(value)
+    elif type(value) is int:
+        return value
+    raise ValueError
+
+
+def validate_row(row, category_ids, format):
+    if row is INVALID_JSON:
+        raise ValueError('invalid JSON')
+    if not isinstance(row, dict):
+        raise ValueError('not a question object')
+    values = {}
+    for column in ('question', 'answer'):
+        text = row.get(column)
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError(f'{column} is missing')
+        values[column] = text.strip()
+    for column in ('category', 'difficulty'):
+        try:
+            values[column] = _integer(row.get(column), format)
+        except ValueError:
+            raise ValueError(f'{column} must be an integer')
+    if values['category'] not in category_ids:
+        raise ValueError(f"category {values['category']} does not exist")
+    if not 1 <= values['difficulty'] <= 5:
+        raise ValueError('difficulty must be between 1 and 5')
+    return values
+
+
+def insert_batch(batch):
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        # COPY skips the per-row statement overhead of executemany
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        for values in batch:
+            writer.writerow([values[column] for column in QUESTION_COLUMNS])
+        buffer.seek(0)
+        cursor = connection.connection.cursor()
+        cursor.copy_expert('COPY questions ({}) FROM STDIN WITH CSV'
+                           .format(', '.join(QUESTION_COLUMNS)), buffer)
+    else:
+        connection.execute(Question.__table__.insert(), batch)
+
+
+'''
+ImportReport
+    counts, the first MAX_REPORTED_ERRORS rejected rows as
+    (line number, reason), and throughput of one import
+'''
+
+
+class ImportReport:
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    def reject(self, line_number, reason):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, reason))
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return (f'imported {self.imported} questions, rejected '
+                f'{self.rejected}, in {self.seconds:.2f}s '
+                f'({self.rows_per_second:.0f} rows/s)')
+
+
+'''
+import_questions(stream, format, chunk_size=IMPORT_CHUNK_SIZE)
+    validates and inserts questions from a CSV or JSONL stream
+    valid rows are inserted chunk_size at a time in one statement and
+    committed per chunk, so a failure part way through keeps the chunks
+    already committed; invalid rows are skipped and reported
+'''
+
+
+def import_questions(stream, format, chunk_size=IMPORT_CHUNK_SIZE):
+    report = ImportReport()
+    category_ids = {id for id, in db.session.query(Category.id)}
+    started = time.perf_counter()
+    batch = []
+    for line_number, row in read_rows(stream, format):
+        try:
+            batch.append(validate_row(row, category_ids, format))
+        except ValueError as error:
+            report.reject(line_number, str(error))
+            continue
+        if len(batch) == chunk_size:
+            insert_batch(batch)
+            db.session.commit()
+            report.imported += len(batch)
+            batch = []
+    if batch:
+        insert_batch(batch)
+        db.session.commit()
+        report.imported += len(batch)
+    # core inserts skip the ORM events the search index listens for
+    question_index.invalidate()
+    report.seconds = time.perf_counter() - started
+    return report
+
+
+'''
+export_questions(category_id=None, chunk_size=EXPORT_CHUNK_SIZE)
+    yields every question (or those in category_id) as a line of JSON,
+    ordered by id; rows are fetched chunk_size at a time and never held
+    as Question objects, so memory stays flat however big the table is
+'''
+
+
+def export_questions(category_id=None, chunk_size=EXPORT_CHUNK_SIZE):
+    query = db.session.query(Question.id, Question.question, Question.answer,
+                             Question.category, Question.difficulty)
+    if category_id is not None:
+        query = query.filter(Question.category == category_id)
+    for row in query.order_by(Question.id).yield_per(chunk_size):
+        yield json.dumps(row._asdict()) + '\n'
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import Category
+
+CATEGORY_CACHE_TTL = 60
+
+
+'''
+CategoryCache
+    keeps the {id: type} category dict in memory between requests.
+    committing an insert, update or delete of a Category in this process
+    bumps `version`, which drops the cached dict. other processes can't see that
+    bump, so entries also expire after `ttl` seconds.
+    `etag` is a hash of the cached content, so every process serving the
+    same categories hands out the same ETag.
+'''
+
+
+class CategoryCache:
+
+    def __init__(self, ttl=CATEGORY_CACHE_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._categories = None
+        self._etag = None
+        self._loaded_version = None
+        self._loaded_at = 0
+
+    def invalidate(self, *args):
+        with self.lock:
+            self.version += 1
+
+    def _fresh(self):
+        return (self._categories is not None and
+                self._loaded_version == self.version and
+                time.monotonic() - self._loaded_at < self.ttl)
+
+    def load(self):
+        '''returns (categories, etag)'''
+        with self.lock:
+            if self._fresh():
+                self.hits += 1
+                return self._categories, self._etag
+            self.misses += 1
+            version = self.version
+        categories = {category.id: category.type
+                      for category in Category.query.order_by(Category.id)}
+        etag = hashlib.sha1(json.dumps(sorted(categories.items()))
+                            .encode('utf-8')).hexdigest()
+        with self.lock:
+            # a write that landed while we were loading makes this stale
+            if version == self.version:
+                self._categories, self._etag = categories, etag
+                self._loaded_version = version
+                self._loaded_at = time.monotonic()
+        return categories, etag
+
+    def get(self):
+        return self.load()[0]
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'version': self.version
+            }
+
+
+'''
+invalidate_on_commit(cache, session)
+    invalidates cache whenever a transaction that inserted, updated or
+    deleted a Category commits. a flush only marks the session: bumping
+    the version at flush would let a request that loads between the flush
+    and the commit (or a rollback) cache the old categories under the new
+    version until the ttl runs out.
+    session may be a Session class; the cache listens on Session itself,
+    as Flask-SQLAlchemy makes a Session subclass per scoped session.
+'''
+
+
+def invalidate_on_commit(cache, session):
+
+    @event.listens_for(session, 'after_flush')
+    def mark_changed(session, flush_context):
+        changed = session.new | session.dirty | session.deleted
+        if any(isinstance(instance, Category) for instance in changed):
+            session.info['category_cache_stale'] = True
+
+    @event.listens_for(session, 'after_commit')
+    def invalidate(session):
+        if session.info.pop('category_cache_stale', False):
+            cache.invalidate()
+
+    @event.listens_for(session, 'after_rollback')
+    def forget(session):
+        session.info.pop('category_cache_stale', None)
+
+
+category_cache = CategoryCache()
+invalidate_on_commit(category_cache, Session)
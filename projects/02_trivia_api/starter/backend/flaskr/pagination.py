@@ -0,0 +1,39 @@
+from sqlalchemy import func
+
+from models import Question
+
+QUESTIONS_PER_PAGE = 10
+# the default cap on ?per_page; an app can raise it with the
+# MAX_QUESTIONS_PER_PAGE config key (the full bank is at /questions/export)
+MAX_QUESTIONS_PER_PAGE = 1000
+
+
+'''
+page_query(query, page, after_id, per_page)
+    the unexecuted query for one page of a Question query, run in the
+    database rather than by loading every row and slicing in Python, for
+    callers that stream the page with yield_per(). with after_id, the page
+    is the next per_page questions whose id is greater than after_id
+    (keyset pagination), which stays cheap on deep pages where OFFSET has
+    to skip every earlier row.
+'''
+
+
+def page_query(query, page=1, after_id=None, per_page=QUESTIONS_PER_PAGE):
+    query = query.order_by(Question.id)
+    if after_id is not None:
+        query = query.filter(Question.id > after_id)
+    else:
+        query = query.offset((max(page, 1) - 1) * per_page)
+    return query.limit(per_page)
+
+
+'''
+count_query(query)
+    SELECT count(id) with the query's filters, without wrapping the query in
+    a subquery the way Query.count() does.
+'''
+
+
+def count_query(query):
+    return query.with_entities(func.count(Question.id)).order_by(None).scalar()
@@ -0,0 +1,154 @@
+import random
+
+from models import Question
+
+SCAN_CHUNK = 200
+SAMPLE_DRAWS = 16
+SAMPLE_ROUNDS = 3
+# bound parameters per statement; SQLite allows 999 in older builds
+MAX_SAMPLE_DRAWS = 500
+MAX_QUIZ_PREFETCH = 50
+
+
+'''
+next_question(category_id, previous_questions)
+    picks a random question from the category (0 for all categories) that
+    is not in previous_questions, or None when none are left.
+    rather than loading the category and filtering it in Python, it reads
+    the smallest and largest unseen ids and draws random ids between them,
+    keeping the first that is a question of the category and unseen, so
+    every unseen question is equally likely. each round of draws is checked
+    in one statement, and a round that misses is retried with more draws;
+    when SAMPLE_ROUNDS of them miss (nearly all of the range was seen or is
+    a gap) it falls back to the first unseen question at or
+    above one more random id, wrapping around to the start of the
+    category. every statement is an index lookup or range scan on
+    (category, id), so the cost doesn't grow with the size of the
+    question bank.
+'''
+
+
+def candidate_query(category_id, previous_questions):
+    query = Question.query
+    if category_id:
+        query = query.filter(Question.category == category_id)
+    if previous_questions:
+        query = query.filter(~Question.id.in_(previous_questions))
+    return query
+
+
+def _draw_ids(ids, low, high, skip, count):
+    '''up to count distinct ids found in ids and not in skip, drawn at
+    random from [low, high] in up to SAMPLE_ROUNDS statements, each making
+    four times as many draws per id still wanted as the last'''
+    drawn = []
+    for attempt in range(SAMPLE_ROUNDS):
+        wanted = count - len(drawn)
+        if not wanted:
+            break
+        draws = min(SAMPLE_DRAWS * 4 ** attempt * wanted, MAX_SAMPLE_DRAWS)
+        draws = [id for id in dict.fromkeys(random.randint(low, high)
+                                            for _ in range(draws))
+                 if id not in skip and id not in drawn]
+        if draws:
+            existing = {id for id, in ids.filter(Question.id.in_(draws))}
+            drawn += [id for id in draws if id in existing][:wanted]
+    return drawn
+
+
+def _scan_unseen_ids(ids, skip, start, stop, count, scan_chunk):
+    '''up to count ids in [start, stop) found in ids and not in skip, in
+    id order, reading scan_chunk ids at a time'''
+    found = []
+    while True:
+        chunk_query = ids.filter(Question.id >= start)
+        if stop is not None:
+            chunk_query = chunk_query.filter(Question.id < stop)
+        chunk = [id for id, in
+                 chunk_query.order_by(Question.id).limit(scan_chunk)]
+        found.extend(id for id in chunk if id not in skip)
+        if len(found) >= count or len(chunk) < scan_chunk:
+            return found[:count]
+        start = chunk[-1] + 1
+
+
+def _sample_ids(ids, skip, count, scan_chunk=SCAN_CHUNK):
+    '''up to count distinct random ids found in ids and not in skip'''
+    # two ordered LIMIT 1 reads rather than one min()/max() query: SQLite
+    # can only answer a lone min or max from the index.
+    low = ids.order_by(Question.id).first()
+    if low is None:
+        return []
+    high = ids.order_by(Question.id.desc()).first()
+    drawn = _draw_ids(ids, low.id, high.id, skip, count)
+    if len(drawn) < count:
+        # the ids left are too sparse in [low, high] for random draws to
+        # find them, so scan for the rest from a random id instead
+        rest = ids.filter(~Question.id.in_(drawn)) if drawn else ids
+        pivot = random.randint(low.id, high.id)
+        for start, stop in ((pivot, None), (low.id, pivot)):
+            drawn += _scan_unseen_ids(rest, skip, start, stop,
+                                      count - len(drawn), scan_chunk)
+            if len(drawn) == count:
+                break
+    return drawn
+
+
+def next_question(category_id, previous_questions):
+    ids = candidate_query(category_id, previous_questions) \
+        .with_entities(Question.id)
+    drawn = _sample_ids(ids, set(previous_questions or ()), 1)
+    return Question.query.get(drawn[0]) if drawn else None
+
+
+'''
+next_unseen_question(category_id, seen, scan_chunk=SCAN_CHUNK)
+    like next_question, but the ids to skip are a set held by the caller
+    (such as a quiz session's SeenSet) rather than a list sent to the
+    database, so each step is the same few index lookups however many
+    questions were already seen. when the random draws all miss, the
+    fallback scan reads ids scan_chunk at a time.
+'''
+
+
+def next_unseen_question(category_id, seen, scan_chunk=SCAN_CHUNK):
+    ids = candidate_query(category_id, None).with_entities(Question.id)
+    drawn = _sample_ids(ids, seen, 1, scan_chunk)
+    return Question.query.get(drawn[0]) if drawn else None
+
+
+'''
+sample_questions(category_id, previous_questions, count)
+    up to count distinct random questions from the category (0 for all)
+    that are not in previous_questions, in random order, for clients that
+    prefetch several quiz steps at once. the ids are drawn as in
+    next_question, each round drawing for all the questions still wanted
+    in one statement, and only the sampled rows are read.
+'''
+
+
+def _questions(ids):
+    if not ids:
+        return []
+    random.shuffle(ids)
+    by_id = {question.id: question for question in
+             Question.query.filter(Question.id.in_(ids))}
+    return [by_id[id] for id in ids if id in by_id]
+
+
+def sample_questions(category_id, previous_questions, count):
+    ids = candidate_query(category_id, previous_questions) \
+        .with_entities(Question.id)
+    return _questions(_sample_ids(ids, set(previous_questions or ()), count))
+
+
+'''
+sample_unseen_questions(category_id, seen, count, scan_chunk=SCAN_CHUNK)
+    sample_questions for a caller holding the ids to skip in a set, as
+    next_unseen_question is to next_question
+'''
+
+
+def sample_unseen_questions(category_id, seen, count, scan_chunk=SCAN_CHUNK):
+    ids = candidate_query(category_id, None).with_entities(Question.id)
+    return _questions(_sample_ids(ids, seen, count, scan_chunk))
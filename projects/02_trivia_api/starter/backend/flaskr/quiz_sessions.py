@@ -0,0 +1,198 @@
+import secrets
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from .quiz import next_unseen_question, sample_unseen_questions
+
+QUIZ_SESSION_TTL = 1800
+MAX_QUIZ_SESSIONS = 10000
+# a SeenSet switches to a bitmap once its id range needs at most this many
+# bits per id held (the sorted array costs 32), and back to the array when
+# a new id would stretch the range past SEEN_SPARSE_BITS_PER_ID; the gap
+# between the two keeps it from switching back and forth
+SEEN_DENSE_BITS_PER_ID = 16
+SEEN_SPARSE_BITS_PER_ID = 64
+
+
+'''
+SeenSet
+    a set of question ids held compactly, so a session's seen questions
+    aren't a list the client sends back on every step. while the ids are
+    spread thin (draws land anywhere in the bank) they are a sorted
+    array of 4-byte ids; once they are dense in the range they span they
+    become bits in a bytearray starting at `base`, which grows by at least
+    its own size at either end so adding ids below it stays cheap.
+    either way it costs at most about 8 bytes per id held.
+'''
+
+
+class SeenSet:
+    __slots__ = ('ids', 'base', 'bits', 'count')
+
+    def __init__(self):
+        self.ids = array('I')
+        self.base = None
+        self.bits = None
+        self.count = 0
+
+    def add(self, id):
+        if self.bits is None:
+            index = bisect_left(self.ids, id)
+            if index < len(self.ids) and self.ids[index] == id:
+                return
+            self.ids.insert(index, id)
+            self.count += 1
+            span = self.ids[-1] - self.ids[0] + 1
+            if span <= SEEN_DENSE_BITS_PER_ID * self.count:
+                self._to_bitmap()
+            return
+        low = min(id, self.base)
+        high = max(id, self.base + len(self.bits) * 8 - 1)
+        if high - low + 1 > SEEN_SPARSE_BITS_PER_ID * (self.count + 1):
+            self._to_array()
+            self.add(id)
+            return
+        if id < self.base:
+            grow = self._growth((self.base - id + 7) // 8)
+            self.bits[:0] = bytes(grow)
+            self.base -= grow * 8
+        offset = id - self.base
+        index = offset >> 3
+        if index >= len(self.bits):
+            self.bits.extend(bytes(self._growth(index - len(self.bits) + 1)))
+        mask = 1 << (offset & 7)
+        if not self.bits[index] & mask:
+            self.bits[index] |= mask
+            self.count += 1
+
+    def _growth(self, needed):
+        # double the bitmap, but never past the size the sparse limit allows
+        room = SEEN_SPARSE_BITS_PER_ID * (self.count + 1) // 8 - len(self.bits)
+        return max(needed, min(len(self.bits), room))
+
+    def _to_bitmap(self):
+        self.base = self.ids[0] - self.ids[0] % 8
+        self.bits = bytearray((self.ids[-1] - self.base) // 8 + 1)
+        for id in self.ids:
+            offset = id - self.base
+            self.bits[offset >> 3] |= 1 << (offset & 7)
+        self.ids = None
+
+    def _to_array(self):
+        self.ids = array('I', (self.base + index * 8 + bit
+                               for index, byte in enumerate(self.bits) if byte
+                               for bit in range(8) if byte & (1 << bit)))
+        self.base = None
+        self.bits = None
+
+    def __contains__(self, id):
+        if self.bits is None:
+            index = bisect_left(self.ids, id)
+            return index < len(self.ids) and self.ids[index] == id
+        if id < self.base:
+            return False
+        offset = id - self.base
+        index = offset >> 3
+        return index < len(self.bits) and bool(self.bits[index] & (1 << (offset & 7)))
+
+    def __len__(self):
+        return self.count
+
+    def nbytes(self):
+        '''the bytes taken by the ids or bits held'''
+        if self.bits is None:
+            return len(self.ids) * self.ids.itemsize
+        return len(self.bits)
+
+
+'''
+QuizSession
+    one player's quiz: the category (0 for all) and the questions already
+    drawn. draw() returns the next unseen question, or None when the
+    category is exhausted, and draw_many(count) up to count of them for
+    prefetching; steps of one session are drawn one at a time.
+'''
+
+
+class QuizSession:
+
+    def __init__(self, category_id):
+        self.id = secrets.token_urlsafe(16)
+        self.category_id = category_id
+        self.seen = SeenSet()
+        self.expires_at = None
+        self.lock = threading.Lock()
+
+    def draw(self):
+        with self.lock:
+            question = next_unseen_question(self.category_id, self.seen)
+            if question is not None:
+                self.seen.add(question.id)
+            return question
+
+    def draw_many(self, count):
+        with self.lock:
+            questions = sample_unseen_questions(self.category_id, self.seen, count)
+            for question in questions:
+                self.seen.add(question.id)
+            return questions
+
+
+'''
+QuizSessionStore
+    quiz sessions in this process's memory, least recently used first.
+    a session expires `ttl` seconds after it was last used, and the oldest
+    are dropped beyond `max_sessions`; both are checked on every create
+    and get, so eviction needs no background thread. sessions aren't
+    shared between processes, so a multi-process deployment needs sticky
+    routing by session id.
+'''
+
+
+class QuizSessionStore:
+
+    def __init__(self, ttl=QUIZ_SESSION_TTL, max_sessions=MAX_QUIZ_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _evict(self, now):
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if session.expires_at > now and len(self.sessions) <= self.max_sessions:
+                break
+            self.sessions.popitem(last=False)
+
+    def create(self, category_id):
+        session = QuizSession(category_id)
+        now = time.monotonic()
+        with self.lock:
+            session.expires_at = now + self.ttl
+            self.sessions[session.id] = session
+            self._evict(now)
+        return session
+
+    def get(self, session_id):
+        '''the live session with this id, its expiry renewed, or None'''
+        now = time.monotonic()
+        with self.lock:
+            self._evict(now)
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.expires_at = now + self.ttl
+                self.sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id):
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+quiz_sessions = QuizSessionStore()
@@ -0,0 +1,137 @@
+import re
+from collections import defaultdict
+
+from sqlalchemy import event, func, or_
+
+from models import db, Question
+from .pagination import QUESTIONS_PER_PAGE, count_query
+
+WORD_RE = re.compile(r'\w+')
+
+
+def escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+'''
+search_document()
+    the tsvector searched on PostgreSQL; the same expression as the
+    ix_questions_search index in models.py
+'''
+
+
+def search_document():
+    return func.to_tsvector(
+        'english',
+        func.coalesce(Question.question, '') + ' ' +
+        func.coalesce(Question.answer, '')
+    )
+
+
+'''
+QuestionIndex
+    in-process stand-in for the PostgreSQL search indexes, used on SQLite
+    (tests and local runs): a trigram -> ids index answering substring
+    matches, like pg_trgm, and a word -> ids index answering all-words
+    matches, like the tsvector (without stemming).
+    any ORM write to a Question marks it stale and it is rebuilt with one
+    query on the next search; bulk inserts call invalidate() themselves.
+'''
+
+
+class QuestionIndex:
+
+    def __init__(self):
+        self.texts = {}
+        self.grams = defaultdict(set)
+        self.words = defaultdict(set)
+        self.stale = True
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(Question, event_name, self.invalidate)
+
+    def invalidate(self, *args):
+        self.stale = True
+
+    def rebuild(self):
+        self.texts = {}
+        self.grams = defaultdict(set)
+        self.words = defaultdict(set)
+        for id, question, answer in db.session.query(
+                Question.id, Question.question, Question.answer):
+            question, answer = (question or '').lower(), (answer or '').lower()
+            self.texts[id] = (question, answer)
+            for gram in trigrams(question) | trigrams(answer):
+                self.grams[gram].add(id)
+            for word in WORD_RE.findall(question + ' ' + answer):
+                self.words[word].add(id)
+        self.stale = False
+
+    def _postings(self, index, keys):
+        postings = sorted((index.get(key, set()) for key in keys), key=len)
+        return set.intersection(*postings) if postings else set()
+
+    def search(self, term):
+        '''returns the ids of matching questions, best match first'''
+        if self.stale:
+            self.rebuild()
+        term = term.lower()
+        if len(term) < 3:
+            candidates = self.texts.keys()
+        else:
+            candidates = self._postings(self.grams, trigrams(term))
+        in_text = {id for id in candidates
+                   if term in self.texts[id][0] or term in self.texts[id][1]}
+        all_words = self._postings(self.words, WORD_RE.findall(term))
+
+        def rank_key(id):
+            question, answer = self.texts[id]
+            position = question.find(term)
+            return (id not in in_text, position < 0, term not in answer,
+                    position, id)
+        return sorted(in_text | all_words, key=rank_key)
+
+
+question_index = QuestionIndex()
+
+
+def _postgres_search(term, page, per_page):
+    document = search_document()
+    query = func.plainto_tsquery('english', term)
+    pattern = '%' + escape_like(term) + '%'
+    matches = Question.query.filter(or_(
+        document.op('@@')(query),
+        Question.question.ilike(pattern, escape='\\'),
+        Question.answer.ilike(pattern, escape='\\')
+    ))
+    rank = func.ts_rank(document, query) + func.similarity(Question.question, term)
+    questions = matches.order_by(rank.desc(), Question.id) \
+        .offset((page - 1) * per_page).limit(per_page).all()
+    return questions, count_query(matches)
+
+
+def _fallback_search(term, page, per_page):
+    ids = question_index.search(term)
+    page_ids = ids[(page - 1) * per_page:page * per_page]
+    by_id = {question.id: question for question in
+             Question.query.filter(Question.id.in_(page_ids))} if page_ids else {}
+    return [by_id[id] for id in page_ids if id in by_id], len(ids)
+
+
+'''
+search_questions(term, page=1, per_page=QUESTIONS_PER_PAGE)
+    questions whose question or answer text contains term, or contains all
+    of its words, ranked by relevance; only the requested page is loaded.
+    returns (questions on the page, total matching questions)
+'''
+
+
+def search_questions(term, page=1, per_page=QUESTIONS_PER_PAGE):
+    term = (term or '').strip()
+    page = max(page, 1)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return _postgres_search(term, page, per_page)
+    return _fallback_search(term, page, per_page)
@@ -0,0 +1,37 @@
+import json
+
+from flask import Response, stream_with_context
+
+STREAM_CHUNK_SIZE = 500
+
+
+'''
+stream_json(fields, items_key, items, chunk_size=STREAM_CHUNK_SIZE)
+    a JSON object response holding `fields` plus `items_key`: a list built
+    from the `items` iterable while the response is being sent.
+    only chunk_size encoded items are held at a time, so passing a query's
+    yield_per() keeps memory flat however many rows the list has, where
+    jsonify would build every dict and the whole JSON string first.
+    the status is sent before the items are read, so an error part way
+    through ends the response early instead of returning a 500.
+'''
+
+
+def stream_json(fields, items_key, items, chunk_size=STREAM_CHUNK_SIZE):
+    def generate():
+        head = json.dumps(fields)[:-1]
+        yield (head + ', ' if fields else head) + json.dumps(items_key) + ': ['
+        separator = ''
+        chunk = []
+        for item in items:
+            chunk.append(json.dumps(item))
+            if len(chunk) == chunk_size:
+                yield separator + ', '.join(chunk)
+                separator = ', '
+                chunk = []
+        if chunk:
+            yield separator + ', '.join(chunk)
+        yield ']}'
+
+    return Response(stream_with_context(generate()),
+                    mimetype='application/json')
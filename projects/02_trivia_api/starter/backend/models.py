@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import Column, String, Integer, create_engine, ForeignKey
+from sqlalchemy import Column, String, Integer, create_engine, ForeignKey, Index, DDL, event
 from flask_sqlalchemy import SQLAlchemy
 import json
 
@@ -33,6 +33,9 @@ class Question(db.Model):
     category = Column(Integer, ForeignKey("categories.id"))
     difficulty = Column(Integer)
 
+    # serves per-category listings and quiz sampling by id range
+    __table_args__ = (Index('ix_questions_category_id', 'category', 'id'),)
+
     def __init__(self, question, answer, category, difficulty):
         self.question = question
         self.answer = answer
@@ -60,6 +63,29 @@ class Question(db.Model):
         }
 
 
+'''
+search indexes
+    full text (tsvector) and trigram indexes behind flaskr.search on
+    PostgreSQL; created with the table by create_all, and by trivia.psql
+    for restored databases. the tsvector expression must stay identical
+    to flaskr.search.search_document() for the index to be used.
+'''
+
+SEARCH_INDEX_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_questions_search ON questions USING gin "
+    "(to_tsvector('english', coalesce(question, '') || ' ' || coalesce(answer, '')))",
+    "CREATE INDEX IF NOT EXISTS ix_questions_question_trgm ON questions "
+    "USING gin (question gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_questions_answer_trgm ON questions "
+    "USING gin (answer gin_trgm_ops)",
+)
+
+for statement in SEARCH_INDEX_DDL:
+    event.listen(Question.__table__, 'after_create',
+                 DDL(statement).execute_if(dialect='postgresql'))
+
+
 '''
 Category
 
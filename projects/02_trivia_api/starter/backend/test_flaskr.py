@@ -1,37 +1,24 @@
+import io
+import json
 import os
+import random
+import tempfile
 import unittest
-import json
-from flask_sqlalchemy import SQLAlchemy
+from collections import Counter
+from unittest import mock
 
-from flaskr import create_app
-from models import setup_db, Question, Category
+from fixtures import TransactionalTestCase, main
+from flaskr.bulk import import_questions
+from flaskr.category_cache import category_cache
+from flaskr.pagination import MAX_QUESTIONS_PER_PAGE
+from flaskr.quiz import next_question, next_unseen_question
+from flaskr.quiz_sessions import SeenSet
+from models import db, Question, Category
 
 
-class TriviaTestCase(unittest.TestCase):
+class TriviaTestCase(TransactionalTestCase):
     """This class represents the trivia test case"""
 
-    def setUp(self):
-        """Define test variables and initialize app."""
-        self.app = create_app()
-        self.client = self.app.test_client
-        self.database_name = "trivia_test"
-        self.database_path = "postgres://{}/{}".format(
-            'localhost:5432',
-            self.database_name
-        )
-        setup_db(self.app, self.database_path)
-
-        # binds the app to the current context
-        with self.app.app_context():
-            self.db = SQLAlchemy()
-            self.db.init_app(self.app)
-            # create all tables
-            self.db.create_all()
-
-    def tearDown(self):
-        """Executed after reach test"""
-        pass
-
     """
     TODO
     Write at least one test for each test for successful operation
@@ -45,6 +32,37 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(json_res['categories'])
         # self.assertTrue(len(json_res['categories']))
 
+    def test_categories_not_modified_for_matching_etag(self):
+        res = self.client().get('/categories')
+        etag = res.headers['ETag']
+        cached_res = self.client().get('/categories',
+                                       headers={'If-None-Match': etag})
+
+        self.assertEqual(cached_res.status_code, 304)
+        self.assertEqual(cached_res.data, b'')
+
+    def test_category_cache_is_invalidated_on_commit(self):
+        category_cache.load()
+        version = category_cache.version
+        db.session.add(Category('Cooking'))
+        db.session.flush()
+        self.assertEqual(category_cache.version, version)
+        db.session.commit()
+
+        self.assertGreater(category_cache.version, version)
+        self.assertIn('Cooking', category_cache.get().values())
+
+    def test_category_cache_ignores_rolled_back_changes(self):
+        category_cache.load()
+        version = category_cache.version
+        db.session.begin_nested()
+        db.session.add(Category('Cooking'))
+        db.session.flush()
+        db.session.rollback()
+
+        self.assertEqual(category_cache.version, version)
+        self.assertNotIn('Cooking', category_cache.get().values())
+
     def test_405_on_delete_all_categories(self):
         res = self.client().delete('/categories')
         json_res = json.loads(res.data)
@@ -58,6 +76,43 @@ class TriviaTestCase(unittest.TestCase):
         self.assertTrue(len(json_res['questions']))
         self.assertIsNone(json_res['current_category'])
 
+    def test_get_questions_page_past_the_end(self):
+        res = self.client().get('/questions?page=1000')
+        json_res = json.loads(res.data)
+
+        self.assertEqual(len(json_res['questions']), 0)
+        self.assertGreater(json_res['total_questions'], 0)
+
+    def test_get_questions_per_page(self):
+        res = self.client().get('/questions?per_page=1000')
+        json_res = json.loads(res.data)
+
+        self.assertEqual(len(json_res['questions']),
+                         json_res['total_questions'])
+
+    def test_get_questions_per_page_is_capped(self):
+        self.add_questions(1, 30)
+        self.app.config['MAX_QUESTIONS_PER_PAGE'] = 25
+        try:
+            res = self.client().get('/questions?per_page=1000')
+        finally:
+            self.app.config['MAX_QUESTIONS_PER_PAGE'] = MAX_QUESTIONS_PER_PAGE
+        json_res = json.loads(res.data)
+
+        self.assertEqual(len(json_res['questions']), 25)
+
+    def test_get_questions_after_id(self):
+        first_page = json.loads(self.client().get('/questions').data)
+        last_id = first_page['questions'][-1]['id']
+        res = self.client().get(f'/questions?after_id={last_id}')
+        json_res = json.loads(res.data)
+
+        self.assertTrue(len(json_res['questions']))
+        self.assertTrue(all(question['id'] > last_id
+                            for question in json_res['questions']))
+        self.assertEqual(json_res['total_questions'],
+                         first_page['total_questions'])
+
     def test_405_on_delete_all_questions(self):
         res = self.client().delete('/questions')
         json_res = json.loads(res.data)
@@ -106,12 +161,25 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(json_res['code'], 422)
 
     def test_search_term(self):
+        self.client().post('/questions', json={
+            'question': 'Greatest Singer of All Time',
+            'answer': 'Eminem',
+            'category': 5,
+            'difficulty': 4
+        })
         res = self.client().post('/questions', json={'searchTerm': 'singer'})
         json_res = json.loads(res.data)
 
         self.assertEqual(json_res['success'], True)
         self.assertGreater(len(json_res['questions']), 0)
 
+    def test_search_matches_answers_and_counts_matches(self):
+        res = self.client().post('/questions', json={'searchTerm': 'mona lisa'})
+        json_res = json.loads(res.data)
+
+        self.assertEqual(json_res['total_questions'], len(json_res['questions']))
+        self.assertIn(17, [question['id'] for question in json_res['questions']])
+
     def test_on_non_existing_search_question_term(self):
         res = self.client().post('/questions', json={
             'searchTerm': 'flkadskfsasfjkdafkas'})
@@ -119,6 +187,17 @@ class TriviaTestCase(unittest.TestCase):
 
         self.assertEqual(len(json_res['questions']), 0)
 
+    def test_export_questions_as_jsonl(self):
+        res = self.client().get('/questions/export?category=1')
+        questions = [json.loads(line) for line in res.data.splitlines()]
+
+        self.assertEqual(res.mimetype, 'application/x-ndjson')
+        self.assertTrue(len(questions))
+        self.assertTrue(all(question['category'] == 1
+                            for question in questions))
+        ids = [question['id'] for question in questions]
+        self.assertEqual(ids, sorted(ids))
+
     def test_get_questions_by_category(self):
         res = self.client().get('/categories/1/questions')
         json_res = json.loads(res.data)
@@ -163,6 +242,73 @@ class TriviaTestCase(unittest.TestCase):
 
         self.assertIsNone(json_res['question'])
 
+    def test_play_quizzes_returns_only_unseen_question(self):
+        category_res = self.client().get('/categories/1/questions')
+        question_ids = [question['id'] for question in
+                        json.loads(category_res.data)['questions']]
+        res = self.client().post('/quizzes', json={
+            'previous_questions': question_ids[1:],
+            'quiz_category': {'type': 'Science', 'id': 1}
+        })
+        json_res = json.loads(res.data)
+
+        self.assertEqual(json_res['question']['id'], question_ids[0])
+
+    def test_play_quizzes_prefetch(self):
+        category_res = self.client().get('/categories/1/questions')
+        question_ids = [question['id'] for question in
+                        json.loads(category_res.data)['questions']]
+        res = self.client().post('/quizzes', json={
+            'previous_questions': question_ids[:1],
+            'quiz_category': {'type': 'Science', 'id': 1},
+            'count': 10
+        })
+        json_res = json.loads(res.data)
+        prefetched_ids = [question['id'] for question in json_res['questions']]
+
+        self.assertEqual(sorted(prefetched_ids), sorted(question_ids[1:]))
+        self.assertEqual(json_res['question']['id'], prefetched_ids[0])
+
+    def add_questions(self, category, count):
+        questions = [Question('Question %d?' % i, 'Answer %d' % i, category, 1)
+                     for i in range(count)]
+        db.session.add_all(questions)
+        db.session.commit()
+        return [question.id for question in questions]
+
+    def test_next_question_is_not_biased_towards_gaps(self):
+        # one unseen question below a long run of seen ones and ten above
+        # it: drawn uniformly, the lone one comes up about 1 time in 11
+        added_ids = self.add_questions(1, 30)
+        previous_questions = [21, 22] + added_ids[:20]
+        draws = Counter(next_question(1, previous_questions).id
+                        for _ in range(300))
+
+        self.assertEqual(set(draws), {20} | set(added_ids[20:]))
+        self.assertLess(draws[20], 75)
+
+    def test_next_unseen_question_is_not_biased_towards_gaps(self):
+        # ten unseen questions above a long run of seen ones: an upward
+        # scan would land on the first of them most of the time
+        added_ids = self.add_questions(1, 30)
+        seen = SeenSet()
+        for id in [20, 21, 22] + added_ids[:20]:
+            seen.add(id)
+        draws = Counter(next_unseen_question(1, seen).id for _ in range(300))
+
+        self.assertEqual(set(draws), set(added_ids[20:]))
+        self.assertLess(draws[added_ids[20]], 75)
+
+    def test_422_if_prefetch_count_out_of_range(self):
+        res = self.client().post('/quizzes', json={
+            'previous_questions': [],
+            'quiz_category': {'type': 'Science', 'id': 1},
+            'count': 1000
+        })
+        json_res = json.loads(res.data)
+
+        self.assertEqual(json_res['code'], 422)
+
     def test_422_play_quizzes_invalid_json_input(self):
         res = self.client().post('/quizzes', json={
             'quiz_category': {
@@ -174,7 +320,134 @@ class TriviaTestCase(unittest.TestCase):
 
         self.assertEqual(json_res['code'], 422)
 
+    def test_quiz_session_draws_each_question_once(self):
+        category_res = self.client().get('/categories/1/questions')
+        question_ids = {question['id'] for question in
+                        json.loads(category_res.data)['questions']}
+        res = self.client().post('/quizzes/sessions', json={
+            'quiz_category': {'type': 'Science', 'id': 1}
+        })
+        session_id = json.loads(res.data)['session_id']
+        drawn = []
+        for _ in range(len(question_ids) + 1):
+            next_res = self.client().post(f'/quizzes/sessions/{session_id}/next')
+            question = json.loads(next_res.data)['question']
+            if question is None:
+                break
+            drawn.append(question['id'])
+
+        self.assertIsNone(question)
+        self.assertEqual(sorted(drawn), sorted(question_ids))
+
+    def test_quiz_session_prefetch(self):
+        added_ids = self.add_questions(1, 30)
+        res = self.client().post('/quizzes/sessions', json={
+            'quiz_category': {'type': 'Science', 'id': 1}
+        })
+        session_id = json.loads(res.data)['session_id']
+        drawn = []
+        for _ in range(4):
+            next_res = self.client().post(f'/quizzes/sessions/{session_id}/next',
+                                          json={'count': 10})
+            drawn.extend(question['id'] for question in
+                         json.loads(next_res.data)['questions'])
+
+        self.assertEqual(sorted(drawn), [20, 21, 22] + added_ids)
+
+    def test_import_questions_jsonl(self):
+        lines = [
+            {'question': 'Q1?', 'answer': 'A1', 'category': 1, 'difficulty': 1},
+            {'question': 'Q2?', 'answer': 'A2', 'category': True, 'difficulty': 1},
+            {'question': 'Q3?', 'answer': 'A3', 'category': 1, 'difficulty': 2.9},
+            {'question': 'Q4?', 'answer': 'A4', 'category': 1, 'difficulty': 2},
+            ['not', 'an', 'object'],
+            {'question': 'Q6?', 'answer': 'A6', 'category': 1000, 'difficulty': 3},
+            {'question': 'Q7?', 'answer': 'A7', 'category': 2, 'difficulty': 5},
+        ]
+        stream = io.StringIO(''.join(json.dumps(line) + '\n' for line in lines[:4]) +
+                             '{"question": "Q5?",\n' +
+                             ''.join(json.dumps(line) + '\n' for line in lines[4:]))
+        with mock.patch.object(db.session, 'commit', wraps=db.session.commit) as commit:
+            report = import_questions(stream, 'jsonl', chunk_size=2)
+
+        self.assertEqual(report.imported, 3)
+        self.assertEqual(report.errors, [
+            (2, 'category must be an integer'),
+            (3, 'difficulty must be an integer'),
+            (5, 'invalid JSON'),
+            (6, 'not a question object'),
+            (7, 'category 1000 does not exist'),
+        ])
+        # one commit per chunk of two valid rows
+        self.assertEqual(commit.call_count, 2)
+        self.assertEqual(Question.query.filter(
+            Question.question.in_(['Q1?', 'Q4?', 'Q7?'])).count(), 3)
+
+    def test_import_questions_csv(self):
+        stream = io.StringIO('question,answer,category,difficulty\n'
+                             'Q1?,A1,1,3\n'
+                             'Q2?,A2,1,2.9\n'
+                             'Q3?,A3,-1,3\n'
+                             ',A4,1,3\n'
+                             'Q5?,A5,1,6\n')
+        report = import_questions(stream, 'csv')
+
+        self.assertEqual(report.imported, 1)
+        self.assertEqual(report.errors, [
+            (3, 'difficulty must be an integer'),
+            (4, 'category must be an integer'),
+            (5, 'question is missing'),
+            (6, 'difficulty must be between 1 and 5'),
+        ])
+
+    def test_import_command_rejects_unknown_extension(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'questions.txt')
+            with open(path, 'w') as questions_file:
+                questions_file.write('{}\n')
+            # the command's own app context would remove the test's session
+            with mock.patch.object(db.session, 'remove'):
+                result = self.app.test_cli_runner().invoke(
+                    args=['import-questions', path])
+
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn("Invalid value for '--format'", result.output)
+
+    def test_404_if_quiz_session_not_exist(self):
+        res = self.client().post('/quizzes/sessions/no-such-session/next')
+        json_res = json.loads(res.data)
+
+        self.assertEqual(json_res['code'], 404)
+
+
+class SeenSetTestCase(unittest.TestCase):
+
+    def test_matches_a_set(self):
+        rng = random.Random(0)
+        for high in (100, 10000, 1000000):
+            seen, expected = SeenSet(), set()
+            for _ in range(3000):
+                id = rng.randint(1, high)
+                seen.add(id)
+                expected.add(id)
+                self.assertIn(id, seen)
+            self.assertEqual(len(seen), len(expected))
+            self.assertEqual({id for id in range(1, min(high, 20000) + 1) if id in seen},
+                             {id for id in expected if id <= 20000})
+
+    def test_stays_small_when_sparse_or_dense(self):
+        rng = random.Random(0)
+        sparse = SeenSet()
+        for id in rng.sample(range(1, 1000001), 50):
+            sparse.add(id)
+        dense = SeenSet()
+        for id in range(100000, 0, -1):
+            dense.add(id)
+
+        self.assertLessEqual(sparse.nbytes(), 50 * 4)
+        self.assertLessEqual(dense.nbytes(), 100000 // 8 * 2)
+
 
 # Make the tests conveniently executable
 if __name__ == "__main__":
-    unittest.main()
+    main()
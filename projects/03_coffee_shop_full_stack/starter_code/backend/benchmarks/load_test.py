@@ -0,0 +1,117 @@
+"""
+Read and write throughput of the drinks table with N concurrent worker
+processes, with setup_db's default SQLite settings and with production
+mode (WAL, pragmas, pooled connections, busy timeout and lock retries).
+
+Each worker loops for DURATION seconds, reading the full drink listing or,
+WRITE_RATIO of the time, inserting a drink or updating an existing one.
+Every run starts from a fresh database file.
+
+Run from the backend directory:
+
+    $ python -m benchmarks.load_test
+    $ python -m benchmarks.load_test --workers 16 --duration 10
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy.exc import OperationalError
+
+from src.database import models
+from src.database.models import db, Drink
+
+SEED_DRINKS = 200
+WRITE_RATIO = 0.2
+RECIPE = json.dumps([{'name': 'espresso', 'color': 'brown', 'parts': 1},
+                     {'name': 'milk', 'color': 'white', 'parts': 3}])
+
+
+def make_app(production):
+    app = Flask(__name__)
+    models.setup_db(app, production=production)
+    return app
+
+
+def seed(production):
+    app = make_app(production)
+    with app.app_context():
+        models.db_drop_and_create_all()
+        db.session.add_all([Drink(title='seed %d' % i, recipe=RECIPE)
+                            for i in range(SEED_DRINKS)])
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+
+
+def worker(number, production, duration, results):
+    random.seed(number)
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    app = make_app(production)
+    with app.app_context():
+        deadline = time.monotonic() + duration
+        written = 0
+        while time.monotonic() < deadline:
+            try:
+                if random.random() < WRITE_RATIO:
+                    if written % 2:
+                        drink = Drink.query.get(random.randint(1, SEED_DRINKS))
+                        drink.title = 'worker %d update %d' % (number, written)
+                        drink.update()
+                    else:
+                        Drink(title='worker %d drink %d' % (number, written), recipe=RECIPE).insert()
+                    written += 1
+                    counts['writes'] += 1
+                else:
+                    # long_projection is memoized; clear it so each read pays for the rows
+                    models.long_projection.cache_clear()
+                    Drink.all_long()
+                    counts['reads'] += 1
+            except OperationalError:
+                db.session.rollback()
+                counts['errors'] += 1
+            finally:
+                db.session.remove()
+    results.put(counts)
+
+
+def run(production, workers, duration):
+    path = os.path.join(tempfile.mkdtemp(), 'load_test.db')
+    models.database_path = 'sqlite:///' + path
+    seed(production)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(i, production, duration, results))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    totals = {'reads': 0, 'writes': 0, 'errors': 0}
+    for _ in processes:
+        for key, value in results.get().items():
+            totals[key] += value
+    for process in processes:
+        process.join()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--duration', type=float, default=5)
+    args = parser.parse_args()
+
+    print('%-10s %8s %10s %10s %8s' % ('mode', 'workers', 'reads/s', 'writes/s', 'locked'))
+    for workers in args.workers:
+        for mode, production in (('default', False), ('production', True)):
+            totals = run(production, workers, args.duration)
+            print('%-10s %8d %10.1f %10.1f %8d' % (
+                mode, workers, totals['reads'] / args.duration,
+                totals['writes'] / args.duration, totals['errors']), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,13 +4,21 @@ from sqlalchemy import exc
 import json
 from flask_cors import CORS
 
-from .database.models import db_drop_and_create_all, setup_db, Drink
+from .database.models import db, db_drop_and_create_all, setup_db, Drink
 from .auth.auth import AuthError, requires_auth
+from .response_cache import ResponseCache, MemoryBackend, SQLiteBackend, invalidate_on_commit
 
 app = Flask(__name__)
 setup_db(app)
 CORS(app)
 
+# set RESPONSE_CACHE_PATH to a SQLite file to share cached drink listings
+# (and their invalidation) between gunicorn workers
+RESPONSE_CACHE_PATH = os.environ.get('RESPONSE_CACHE_PATH')
+response_cache = ResponseCache(SQLiteBackend(RESPONSE_CACHE_PATH) if RESPONSE_CACHE_PATH
+                               else MemoryBackend())
+invalidate_on_commit(response_cache, db.session, Drink)
+
 '''
 @TODO uncomment the following line to initialize the datbase
 !! NOTE THIS WILL DROP ALL RECORDS AND START YOUR DB FROM SCRATCH
@@ -27,6 +35,11 @@ CORS(app)
     returns status code 200 and json {"success": True, "drinks": drinks} where drinks is the list of drinks
         or appropriate status code indicating reason for failure
 '''
+@app.route('/drinks')
+def get_drinks():
+    return response_cache.json_response(
+        'drinks', lambda: {'success': True, 'drinks': Drink.all_short()},
+        request, app.response_class)
 
 
 '''
@@ -37,6 +50,12 @@ CORS(app)
     returns status code 200 and json {"success": True, "drinks": drinks} where drinks is the list of drinks
         or appropriate status code indicating reason for failure
 '''
+@app.route('/drinks-detail')
+@requires_auth('get:drinks-detail')
+def get_drinks_detail(payload):
+    return response_cache.json_response(
+        'drinks-detail', lambda: {'success': True, 'drinks': Drink.all_long()},
+        request, app.response_class)
 
 
 '''
@@ -108,3 +127,10 @@ def unprocessable(error):
 @TODO implement error handler for AuthError
     error handler should conform to general task above 
 '''
+@app.errorhandler(AuthError)
+def auth_error(error):
+    return jsonify({
+                    "success": False, 
+                    "error": error.status_code,
+                    "message": error.error['description']
+                    }), error.status_code
@@ -0,0 +1,117 @@
+# This module is kept identical in BasicFlaskAuth/jwks.py and
+# projects/03_coffee_shop_full_stack/starter_code/backend/src/auth/jwks.py;
+# change both, and their test_jwks.py, together.
+import json
+import re
+import threading
+import time
+from urllib.request import urlopen
+
+DEFAULT_MAX_AGE = 600
+MIN_REFETCH_INTERVAL = 30
+REFRESH_AHEAD = 0.8
+FETCH_TIMEOUT = 5
+
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+def parse_max_age(cache_control, default=DEFAULT_MAX_AGE):
+    """Seconds from a Cache-Control header, or default when absent."""
+    match = MAX_AGE_RE.search(cache_control or '')
+    return int(match.group(1)) if match else default
+
+
+def rsa_key(key):
+    return {
+        'kty': key['kty'],
+        'kid': key['kid'],
+        'use': key['use'],
+        'n': key['n'],
+        'e': key['e']
+    }
+
+
+class JWKSKeyStore:
+    """Signing keys from a JWKS document, cached by kid.
+
+    The document is fetched once and kept for the max-age its server sends
+    in Cache-Control. Once REFRESH_AHEAD of that time has passed, the next
+    lookup starts a background refetch and keeps using the cached keys in
+    the meantime. An unknown kid (e.g. right after a key rotation) forces a
+    refetch, but at most once every min_refetch_interval seconds, and
+    concurrent callers share a single fetch instead of each starting one.
+    A failed fetch keeps the cached keys (stale or not) and is retried at
+    most once every min_refetch_interval seconds.
+
+    source is a URL (https://, http://, file://) or a plain path to a JWKS
+    file, so tests can point it at a local file or stub server.
+    """
+
+    def __init__(self, source, default_max_age=DEFAULT_MAX_AGE,
+                 min_refetch_interval=MIN_REFETCH_INTERVAL):
+        self.source = source
+        self.default_max_age = default_max_age
+        self.min_refetch_interval = min_refetch_interval
+        self.keys = {}
+        self.refresh_at = 0
+        self.expires_at = 0
+        self.last_attempt = None
+        self._fetch_lock = threading.Lock()
+        self._background = None
+
+    def _read(self):
+        if '://' not in self.source:
+            with open(self.source) as jwks_file:
+                return json.load(jwks_file), self.default_max_age
+        response = urlopen(self.source, timeout=FETCH_TIMEOUT)
+        max_age = parse_max_age(response.headers.get('Cache-Control'), self.default_max_age)
+        return json.loads(response.read()), max_age
+
+    def _fetch(self):
+        self.last_attempt = time.monotonic()
+        try:
+            jwks, max_age = self._read()
+        except Exception:
+            # Serve the keys we already have rather than failing every
+            # request, and don't try again for min_refetch_interval, so an
+            # unreachable issuer costs one fetch per interval, not one per
+            # request.
+            retry_at = time.monotonic() + self.min_refetch_interval
+            self.refresh_at = retry_at
+            self.expires_at = retry_at
+            if self.keys:
+                return
+            raise
+        self.keys = {key['kid']: rsa_key(key) for key in jwks['keys']}
+        fetched_at = time.monotonic()
+        self.refresh_at = fetched_at + max_age * REFRESH_AHEAD
+        self.expires_at = fetched_at + max_age
+
+    def refresh(self):
+        """Refetch the document, or wait for the fetch already in flight."""
+        if self._fetch_lock.acquire(blocking=False):
+            try:
+                self._fetch()
+            finally:
+                self._fetch_lock.release()
+        else:
+            with self._fetch_lock:
+                pass
+
+    def _refresh_in_background(self):
+        if self._background is None or not self._background.is_alive():
+            self._background = threading.Thread(target=self.refresh, daemon=True)
+            self._background.start()
+
+    def get_key(self, kid):
+        """The RSA key for kid, or None if the issuer doesn't publish it."""
+        now = time.monotonic()
+        if now >= self.expires_at:
+            self.refresh()
+        elif now >= self.refresh_at:
+            self._refresh_in_background()
+        key = self.keys.get(kid)
+        if key is None and time.monotonic() - self.last_attempt >= self.min_refetch_interval:
+            self.refresh()
+            key = self.keys.get(kid)
+        return key
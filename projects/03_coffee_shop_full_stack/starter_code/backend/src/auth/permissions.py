@@ -0,0 +1,45 @@
+class PermissionRequirement:
+    """A set of permission strings, of which all or any must be granted.
+
+    Built once when requires_auth decorates a view; each request then costs
+    a single set operation against the token's granted permissions.
+    """
+
+    def __init__(self, permissions, match_any=False):
+        self.permissions = frozenset(permissions)
+        self.match_any = match_any
+
+    def satisfied_by(self, granted):
+        if self.match_any:
+            return not self.permissions.isdisjoint(granted)
+        return self.permissions <= granted
+
+    def __repr__(self):
+        kind = 'any_of' if self.match_any else 'all_of'
+        return '%s(%s)' % (kind, ', '.join(sorted(self.permissions)))
+
+
+def all_of(*permissions):
+    return PermissionRequirement(permissions)
+
+
+def any_of(*permissions):
+    return PermissionRequirement(permissions, match_any=True)
+
+
+def compile_permissions(spec):
+    """A PermissionRequirement from a permission string, a list of them
+    (all required), or a requirement built with all_of/any_of. An empty
+    string only requires a valid token."""
+    if isinstance(spec, PermissionRequirement):
+        return spec
+    if isinstance(spec, str):
+        return all_of(spec) if spec else all_of()
+    return all_of(*spec)
+
+
+def granted_permissions(payload):
+    """The payload's permissions claim as a frozenset, None when absent."""
+    if 'permissions' not in payload:
+        return None
+    return frozenset(payload['permissions'])
@@ -1,23 +1,86 @@
 import os
-from sqlalchemy import Column, String, Integer
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from sqlalchemy import Column, String, Integer, event, inspect
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
 from flask_sqlalchemy import SQLAlchemy
 import json
 
 database_filename = "database.db"
+PROJECTION_CACHE_SIZE = 4096
 project_dir = os.path.dirname(os.path.abspath(__file__))
-database_path = "sqlite:///{}".format(os.path.join(project_dir, database_filename))
+database_path = os.environ.get("DATABASE_URL", "sqlite:///{}".format(os.path.join(project_dir, database_filename)))
+
+# production mode, see setup_db()
+SQLITE_PRODUCTION = os.environ.get("SQLITE_PRODUCTION") == "1"
+POOL_SIZE = 5
+POOL_OVERFLOW = 10
+BUSY_TIMEOUT = 10
+LOCK_RETRIES = 3
+LOCK_RETRY_DELAY = 0.05
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+)
 
 db = SQLAlchemy()
 
 '''
-setup_db(app)
+setup_db(app, production=SQLITE_PRODUCTION)
     binds a flask application and a SQLAlchemy service
+    production mode (SQLITE_PRODUCTION=1) is for several workers sharing
+    the database file: every new connection switches to WAL journaling, so
+    readers no longer block on a writer, with fsync only at checkpoints, a
+    20MB page cache and 256MB of mmap; connections are pooled instead of
+    reopened per request, and writers wait up to BUSY_TIMEOUT seconds for
+    the lock instead of failing with "database is locked"
 '''
-def setup_db(app):
+def setup_db(app, production=SQLITE_PRODUCTION):
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    if production:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            "poolclass": QueuePool,
+            "pool_size": POOL_SIZE,
+            "max_overflow": POOL_OVERFLOW,
+            "connect_args": {"timeout": BUSY_TIMEOUT, "check_same_thread": False},
+        }
     db.app = app
     db.init_app(app)
+    if production:
+        with app.app_context():
+            event.listen(db.engine, "connect", apply_pragmas)
+
+def apply_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+'''
+commit(stage)
+    stage() puts the pending change in the session, then it is committed
+    when SQLite still reports the database locked (the busy timeout ran out,
+    or two transactions would deadlock, where SQLite gives up at once) the
+    session is rolled back and stage() re-applies the change before the
+    next of LOCK_RETRIES attempts
+'''
+def commit(stage):
+    for attempt in range(LOCK_RETRIES + 1):
+        stage()
+        try:
+            db.session.commit()
+            return
+        except OperationalError as error:
+            db.session.rollback()
+            if attempt == LOCK_RETRIES or "database is locked" not in str(error):
+                raise
+            time.sleep(LOCK_RETRY_DELAY * 2 ** attempt)
 
 '''
 db_drop_and_create_all()
@@ -29,6 +92,52 @@ def db_drop_and_create_all():
     db.drop_all()
     db.create_all()
 
+'''
+freeze(value) / thaw(value)
+    freeze() turns parsed JSON into read-only mappings and tuples, so a
+    memoized value can be shared; thaw() copies it back into fresh dicts
+    and lists that the caller is free to modify
+'''
+def freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+'''
+short_projection(id, title, recipe) / long_projection(id, title, recipe)
+    the short()/long() data for one version of a drink row, frozen
+    both are memoized on the row's values, so a recipe blob is parsed once
+    per (id, title, recipe) version, however many requests or instances
+    read it; editing any of the three simply misses the cache
+    the cached values are shared between callers, so they are read-only;
+    Drink.short()/long() thaw them into new dicts for each call
+'''
+@lru_cache(maxsize=PROJECTION_CACHE_SIZE)
+def long_projection(id, title, recipe):
+    return freeze({
+        'id': id,
+        'title': title,
+        'recipe': json.loads(recipe)
+    })
+
+@lru_cache(maxsize=PROJECTION_CACHE_SIZE)
+def short_projection(id, title, recipe):
+    return freeze({
+        'id': id,
+        'title': title,
+        'recipe': [{'color': r['color'], 'parts': r['parts']}
+                   for r in long_projection(id, title, recipe)['recipe']]
+    })
+
 '''
 Drink
 a persistent drink entity, extends the base SQLAlchemy Model
@@ -47,24 +156,14 @@ class Drink(db.Model):
         short form representation of the Drink model
     '''
     def short(self):
-        print(json.loads(self.recipe))
-        short_recipe = [{'color': r['color'], 'parts': r['parts']} for r in json.loads(self.recipe)]
-        return {
-            'id': self.id,
-            'title': self.title,
-            'recipe': short_recipe
-        }
+        return thaw(short_projection(self.id, self.title, self.recipe))
 
     '''
     long()
         long form representation of the Drink model
     '''
     def long(self):
-        return {
-            'id': self.id,
-            'title': self.title,
-            'recipe': json.loads(self.recipe)
-        }
+        return thaw(long_projection(self.id, self.title, self.recipe))
 
     '''
     insert()
@@ -76,8 +175,7 @@ class Drink(db.Model):
             drink.insert()
     '''
     def insert(self):
-        db.session.add(self)
-        db.session.commit()
+        commit(lambda: db.session.add(self))
 
     '''
     delete()
@@ -88,8 +186,7 @@ class Drink(db.Model):
             drink.delete()
     '''
     def delete(self):
-        db.session.delete(self)
-        db.session.commit()
+        commit(lambda: db.session.delete(self))
 
     '''
     update()
@@ -101,7 +198,37 @@ class Drink(db.Model):
             drink.update()
     '''
     def update(self):
-        db.session.commit()
+        # a rollback would discard the changed attributes, so keep them to
+        # re-apply on a retry
+        changes = {attr.key: attr.value for attr in inspect(self).attrs
+                   if attr.history.has_changes()}
+
+        def stage():
+            for key, value in changes.items():
+                setattr(self, key, value)
+        commit(stage)
+
+    '''
+    all_short() / all_long()
+        short()/long() of every drink, ordered by id
+        reads only the three projected columns, without building Drink
+        instances, and reuses the memoized projections; each call returns
+        new dicts
+        EXAMPLE
+            drinks = Drink.all_short()
+    '''
+    @classmethod
+    def _all(cls, projection):
+        rows = db.session.query(cls.id, cls.title, cls.recipe).order_by(cls.id)
+        return [thaw(projection(*row)) for row in rows]
+
+    @classmethod
+    def all_short(cls):
+        return cls._all(short_projection)
+
+    @classmethod
+    def all_long(cls):
+        return cls._all(long_projection)
 
     def __repr__(self):
         return json.dumps(self.short())
\ No newline at end of file
@@ -0,0 +1,191 @@
+import gzip
+import hashlib
+import json
+import sqlite3
+import threading
+
+from sqlalchemy import event
+
+GZIP_LEVEL = 6
+
+
+'''
+CachedResponse
+    one serialized JSON body, its gzip-compressed copy and the body's etag
+'''
+class CachedResponse:
+
+    def __init__(self, body, gzipped, etag):
+        self.body = body
+        self.gzipped = gzipped
+        self.etag = etag
+
+    @classmethod
+    def from_body(cls, body):
+        return cls(body, gzip.compress(body, GZIP_LEVEL),
+                   hashlib.sha1(body).hexdigest())
+
+
+'''
+MemoryBackend
+    cached responses in this process only
+    with several gunicorn workers each one keeps (and invalidates) its own
+    copy, so a write is only seen at once by the worker that made it
+'''
+class MemoryBackend:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self._generation = 0
+
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, generation, entry):
+        with self.lock:
+            if generation == self._generation:
+                self.entries[key] = entry
+
+    def invalidate(self):
+        with self.lock:
+            self._generation += 1
+            self.entries.clear()
+
+
+'''
+SQLiteBackend(path)
+    cached responses in a SQLite file shared by every worker on the host
+    an entry is only served while it belongs to the current generation, so
+    one worker's invalidate() is seen by all the others on their next read
+'''
+class SQLiteBackend:
+
+    def __init__(self, path, timeout=5):
+        self.path = path
+        self.timeout = timeout
+        self.local = threading.local()
+        with self._connect() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS generation '
+                               '(id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER NOT NULL)')
+            connection.execute('INSERT OR IGNORE INTO generation VALUES (0, 0)')
+            connection.execute('CREATE TABLE IF NOT EXISTS responses '
+                               '(key TEXT PRIMARY KEY, generation INTEGER NOT NULL, '
+                               'etag TEXT NOT NULL, body BLOB NOT NULL, gzipped BLOB NOT NULL)')
+
+    def _connect(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self.local.connection = connection
+        return connection
+
+    def generation(self):
+        return self._connect().execute('SELECT value FROM generation').fetchone()[0]
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT body, gzipped, etag FROM responses JOIN generation '
+            'ON responses.generation = generation.value WHERE key = ?', (key,)).fetchone()
+        return CachedResponse(*row) if row else None
+
+    def put(self, key, generation, entry):
+        # a write that bumped the generation while we were building makes
+        # this entry stale, so it is only stored if the generation still matches
+        with self._connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO responses '
+                'SELECT ?, value, ?, ?, ? FROM generation WHERE value = ?',
+                (key, entry.etag, entry.body, entry.gzipped, generation))
+
+    def invalidate(self):
+        with self._connect() as connection:
+            connection.execute('UPDATE generation SET value = value + 1')
+            connection.execute('DELETE FROM responses')
+
+
+'''
+ResponseCache(backend)
+    serialized JSON responses keyed by name
+    json_response(key, build, request, response_class) serves the cached
+    body for key, calling build() and storing its JSON only on a miss;
+    the response carries an ETag (answering If-None-Match with a 304) and
+    is sent gzip-compressed to clients that accept it
+'''
+class ResponseCache:
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, *args):
+        self.backend.invalidate()
+
+    def load(self, key, build):
+        entry = self.backend.get(key)
+        # += on an attribute isn't atomic, and requests run on many threads
+        with self.lock:
+            if entry is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if entry is not None:
+            return entry
+        generation = self.backend.generation()
+        entry = CachedResponse.from_body(json.dumps(build()).encode('utf-8'))
+        self.backend.put(key, generation, entry)
+        return entry
+
+    def json_response(self, key, build, request, response_class):
+        entry = self.load(key, build)
+        response = response_class(mimetype='application/json')
+        response.vary.add('Accept-Encoding')
+        response.cache_control.no_cache = True
+        if 'gzip' in request.accept_encodings:
+            response.set_data(entry.gzipped)
+            response.headers['Content-Encoding'] = 'gzip'
+            response.set_etag(entry.etag + '-gzip')
+        else:
+            response.set_data(entry.body)
+            response.set_etag(entry.etag)
+        return response.make_conditional(request)
+
+    def stats(self):
+        with self.lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0
+        }
+
+
+'''
+invalidate_on_commit(cache, session, model)
+    invalidates cache whenever a transaction that inserted, updated or
+    deleted a model instance commits; waiting for the commit keeps other
+    requests from re-caching the old rows in between
+'''
+def invalidate_on_commit(cache, session, model):
+
+    @event.listens_for(session, 'after_flush')
+    def mark_changed(session, flush_context):
+        changed = session.new | session.dirty | session.deleted
+        if any(isinstance(instance, model) for instance in changed):
+            session.info['response_cache_stale'] = True
+
+    @event.listens_for(session, 'after_commit')
+    def invalidate(session):
+        if session.info.pop('response_cache_stale', False):
+            cache.invalidate()
+
+    @event.listens_for(session, 'after_rollback')
+    def forget(session):
+        session.info.pop('response_cache_stale', None)
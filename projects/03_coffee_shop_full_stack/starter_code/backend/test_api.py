@@ -0,0 +1,49 @@
+import json
+import os
+import unittest
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from src.api import app
+from src.database.models import db
+
+
+class AuthErrorHandlerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.context = app.app_context()
+        self.context.push()
+        db.create_all()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_401_without_token(self):
+        res = self.client.get('/drinks-detail')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 401)
+        self.assertEqual(data, {'success': False, 'error': 401,
+                                'message': 'Authorization header is expected.'})
+
+    def test_401_with_malformed_token(self):
+        res = self.client.get('/drinks-detail',
+                              headers={'Authorization': 'Bearer not-a-jwt'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 401)
+        self.assertFalse(data['success'])
+
+    def test_public_drinks_need_no_token(self):
+        res = self.client.get('/drinks')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(json.loads(res.data), {'success': True, 'drinks': []})
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import base64
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from Crypto.PublicKey import RSA
+from flask import Flask
+from jose import jwt
+
+from src.auth import auth
+from src.auth.auth import (AuthError, all_of, any_of, check_permissions,
+                           get_token_auth_header, verify_decode_jwt)
+from src.auth.jwks import JWKSKeyStore
+from src.auth.token_cache import VerifiedTokenCache
+
+KID = 'test-key'
+
+
+def b64(number):
+    data = number.to_bytes((number.bit_length() + 7) // 8, 'big')
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def setUpModule():
+    global private_pem, jwks_directory
+    key = RSA.generate(2048)
+    private_pem = key.exportKey('PEM').decode()
+    jwks_directory = tempfile.TemporaryDirectory()
+    path = os.path.join(jwks_directory.name, 'jwks.json')
+    with open(path, 'w') as jwks_file:
+        json.dump({'keys': [{'kty': 'RSA', 'kid': KID, 'use': 'sig',
+                             'n': b64(key.n), 'e': b64(key.e)}]}, jwks_file)
+    auth.jwks_store = JWKSKeyStore(path)
+
+
+def tearDownModule():
+    jwks_directory.cleanup()
+
+
+def make_token(kid=KID, audience=auth.API_AUDIENCE, expires_in=3600, permissions=()):
+    claims = {'iss': 'https://' + auth.AUTH0_DOMAIN + '/', 'aud': audience,
+              'sub': 'user', 'exp': int(time.time()) + expires_in,
+              'permissions': list(permissions)}
+    return jwt.encode(claims, private_pem, algorithm='RS256', headers={'kid': kid})
+
+
+class TokenAuthHeaderTestCase(unittest.TestCase):
+
+    def header_token(self, authorization):
+        headers = {'Authorization': authorization} if authorization else {}
+        with Flask(__name__).test_request_context(headers=headers):
+            return get_token_auth_header()
+
+    def test_bearer_token(self):
+        self.assertEqual(self.header_token('Bearer abc.def.ghi'), 'abc.def.ghi')
+
+    def test_malformed_headers(self):
+        for authorization, code in ((None, 'authorization_header_missing'),
+                                    ('Basic abc', 'invalid_header'),
+                                    ('Bearer', 'invalid_header'),
+                                    ('Bearer a b', 'invalid_header')):
+            with self.assertRaises(AuthError) as raised:
+                self.header_token(authorization)
+            self.assertEqual(raised.exception.error['code'], code)
+            self.assertEqual(raised.exception.status_code, 401)
+
+
+class VerifyDecodeJwtTestCase(unittest.TestCase):
+
+    def assertAuthError(self, token, code):
+        with self.assertRaises(AuthError) as raised:
+            verify_decode_jwt(token)
+        self.assertEqual(raised.exception.error['code'], code)
+
+    def test_valid_token(self):
+        payload = verify_decode_jwt(make_token(permissions=['get:drinks-detail']))
+        self.assertEqual(payload['permissions'], ['get:drinks-detail'])
+
+    def test_expired_token(self):
+        self.assertAuthError(make_token(expires_in=-10), 'token_expired')
+
+    def test_wrong_audience(self):
+        self.assertAuthError(make_token(audience='other'), 'invalid_claims')
+
+    def test_unknown_kid(self):
+        self.assertAuthError(make_token(kid='other-key'), 'invalid_header')
+
+    def test_tampered_signature(self):
+        header, payload, signature = make_token().split('.')
+        forged = base64.urlsafe_b64encode(json.dumps({
+            'iss': 'https://' + auth.AUTH0_DOMAIN + '/', 'aud': auth.API_AUDIENCE,
+            'sub': 'admin', 'exp': int(time.time()) + 3600}).encode()).rstrip(b'=').decode()
+        self.assertAuthError('.'.join((header, forged, signature)), 'invalid_header')
+
+
+class CheckPermissionsTestCase(unittest.TestCase):
+
+    payload = {'permissions': ['get:drinks-detail', 'post:drinks']}
+
+    def assertAuthError(self, permission, payload, status_code):
+        with self.assertRaises(AuthError) as raised:
+            check_permissions(permission, payload)
+        self.assertEqual(raised.exception.status_code, status_code)
+
+    def test_granted_permissions(self):
+        for permission in ('post:drinks', ['post:drinks', 'get:drinks-detail'],
+                           any_of('patch:drinks', 'post:drinks'), ''):
+            self.assertTrue(check_permissions(permission, self.payload))
+
+    def test_missing_permissions(self):
+        self.assertAuthError('patch:drinks', self.payload, 403)
+        self.assertAuthError(all_of('post:drinks', 'patch:drinks'), self.payload, 403)
+        self.assertAuthError('post:drinks', {'sub': 'user'}, 400)
+
+
+class VerifiedTokenCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.verified = []
+
+    def verify(self, token):
+        self.verified.append(token)
+        return {'sub': token, 'exp': time.time() + 3600, 'permissions': ['get:drinks-detail']}
+
+    def test_verified_token_is_cached(self):
+        cache = VerifiedTokenCache()
+        for _ in range(3):
+            payload, permissions = cache.get_or_verify('token', self.verify)
+
+        self.assertEqual(self.verified, ['token'])
+        self.assertEqual(permissions, frozenset(['get:drinks-detail']))
+        self.assertEqual(cache.stats()['hits'], 2)
+
+    def test_entry_expires_with_the_token(self):
+        cache = VerifiedTokenCache()
+        cache.get_or_verify('token', lambda token: {'sub': token, 'exp': time.time() - 1})
+        cache.get_or_verify('token', self.verify)
+
+        self.assertEqual(self.verified, ['token'])
+
+    def test_entry_expires_after_ttl(self):
+        cache = VerifiedTokenCache(ttl=0.05)
+        cache.get_or_verify('token', self.verify)
+        time.sleep(0.06)
+        cache.get_or_verify('token', self.verify)
+
+        self.assertEqual(self.verified, ['token', 'token'])
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = VerifiedTokenCache(maxsize=2)
+        for token in ('a', 'b', 'a', 'c', 'a', 'b'):
+            cache.get_or_verify(token, self.verify)
+
+        self.assertEqual(self.verified, ['a', 'b', 'c', 'b'])
+
+    def test_failed_verification_is_not_cached(self):
+        cache = VerifiedTokenCache()
+
+        def reject(token):
+            self.verified.append(token)
+            raise AuthError({'code': 'invalid_header'}, 401)
+        for _ in range(2):
+            with self.assertRaises(AuthError):
+                cache.get_or_verify('token', reject)
+        self.assertEqual(self.verified, ['token', 'token'])
+        self.assertEqual(cache.stats()['size'], 0)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
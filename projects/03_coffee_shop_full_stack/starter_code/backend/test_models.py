@@ -0,0 +1,48 @@
+import json
+import os
+import unittest
+
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from src.api import app
+from src.database.models import db, Drink
+
+RECIPE = [{'name': 'milk', 'color': 'white', 'parts': 1},
+          {'name': 'coffee', 'color': 'brown', 'parts': 2}]
+
+
+class DrinkProjectionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.context = app.app_context()
+        self.context.push()
+        db.create_all()
+        Drink(title='Latte', recipe=json.dumps(RECIPE)).insert()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_projections(self):
+        drink = Drink.query.one()
+
+        self.assertEqual(drink.long(), {'id': drink.id, 'title': 'Latte', 'recipe': RECIPE})
+        self.assertEqual(drink.short()['recipe'], [{'color': 'white', 'parts': 1},
+                                                   {'color': 'brown', 'parts': 2}])
+
+    def test_modifying_a_result_leaves_the_cache_intact(self):
+        for drinks in (Drink.all_long(), Drink.all_short(), [Drink.query.one().long()]):
+            drinks[0]['title'] = 'Changed'
+            drinks[0]['recipe'][0]['color'] = 'black'
+            drinks[0]['recipe'].append({'color': 'red', 'parts': 9})
+
+        long = Drink.all_long()[0]
+        self.assertEqual(long['title'], 'Latte')
+        self.assertEqual(long['recipe'], RECIPE)
+        self.assertEqual(len(Drink.all_short()[0]['recipe']), 2)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from flask import Flask
+
+from src.response_cache import ResponseCache, MemoryBackend, SQLiteBackend
+
+app = Flask(__name__)
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return {'success': True, 'drinks': ['drink %d' % self.builds]}
+
+    def respond(self, cache, headers=None):
+        with app.test_request_context(headers=headers or {}) as context:
+            return cache.json_response('drinks', self.build, context.request,
+                                       app.response_class)
+
+    def test_body_is_built_once_until_invalidated(self):
+        cache = ResponseCache(MemoryBackend())
+        for _ in range(3):
+            response = self.respond(cache)
+        self.assertEqual(json.loads(response.get_data()), {'success': True, 'drinks': ['drink 1']})
+        cache.invalidate()
+        response = self.respond(cache)
+
+        self.assertEqual(json.loads(response.get_data())['drinks'], ['drink 2'])
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 2, 'hit_rate': 0.5})
+
+    def test_etag_and_gzip(self):
+        cache = ResponseCache(MemoryBackend())
+        response = self.respond(cache, {'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.get_data()))['drinks'], ['drink 1'])
+
+        etag = self.respond(cache).headers['ETag']
+        not_modified = self.respond(cache, {'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_invalidation_is_shared_through_sqlite(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.db')
+            worker_1 = ResponseCache(SQLiteBackend(path))
+            worker_2 = ResponseCache(SQLiteBackend(path))
+            self.respond(worker_1)
+            self.respond(worker_2)
+            worker_1.invalidate()
+            self.respond(worker_2)
+
+        self.assertEqual(self.builds, 2)
+        self.assertEqual(worker_2.stats()['hits'], 1)
+
+    def test_stale_build_is_not_stored(self):
+        backend = MemoryBackend()
+        cache = ResponseCache(backend)
+
+        def build_during_write():
+            backend.invalidate()
+            return self.build()
+        cache.load('drinks', build_during_write)
+
+        self.assertIsNone(backend.get('drinks'))
+
+    def test_counts_are_exact_under_concurrency(self):
+        cache = ResponseCache(MemoryBackend())
+        cache.load('drinks', self.build)
+
+        def lookups():
+            for _ in range(2000):
+                cache.load('drinks', self.build)
+        threads = [threading.Thread(target=lookups) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(cache.stats()['hits'], 16000)
+
+
+# Make the tests conveniently executable
+if __name__ == "__main__":
+    unittest.main()